@@ -0,0 +1,102 @@
+import os
+import threading
+
+import pygame
+
+#every file the game uses, so they can all be read behind the loading screen
+IMAGES = ("grass.png", "finaltree.png", "finalrock.png", "ammo_box.png", "hp_box.png",
+          "survivor-move_rifle_0.png", "skeleton-attack_0.png", "boss.png")
+SOUNDS = ("shoot.ogg", "zombie_move.wav")
+
+
+#magenta and black checks, obvious on screen without stopping the game
+def placeholder(size=(64, 64), check=8):
+    surface = pygame.Surface(size)
+    surface.fill((0, 0, 0))
+    for x in range(0, size[0], check):
+        for y in range(0, size[1], check):
+            if (x // check + y // check) % 2 == 0:
+                surface.fill((255, 0, 255), (x, y, check, check))
+    return surface
+
+
+#loads every file once and hands out shared copies. scaled and converted versions are
+#cached by (name, size, alpha) so asking twice never touches the disk or rescales.
+#files are decoded on a background thread, only convert() waits for the main thread
+#because it needs the display. a missing image becomes a placeholder and a missing
+#sound comes back as None
+class AssetManager:
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.raw = {}
+        self.surfaces = {}
+        self.missing = []
+        self.queued = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def read(self, name):
+        path = os.path.join(self.directory, name)
+        try:
+            if name.endswith((".ogg", ".wav")):
+                asset = pygame.mixer.Sound(path)
+            else:
+                asset = pygame.image.load(path)
+        except (pygame.error, OSError):
+            asset = None
+        with self.lock:
+            self.raw[name] = asset
+            if asset is None:
+                self.missing.append(name)
+        return asset
+
+    def preload(self, names=IMAGES + SOUNDS):
+        self.queued = [name for name in names if name not in self.raw]
+        self.thread = threading.Thread(target=self.read_all, args=(list(self.queued),), daemon=True)
+        self.thread.start()
+
+    def read_all(self, names):
+        for name in names:
+            self.read(name)
+
+    def progress(self):
+        if not self.queued:
+            return 1.0
+        with self.lock:
+            done = sum(1 for name in self.queued if name in self.raw)
+        return done / len(self.queued)
+
+    def ready(self):
+        return self.thread is None or not self.thread.is_alive()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    def load(self, name):
+        if name not in self.raw:
+            #something asked before the preload got to it
+            if name in self.queued:
+                self.wait()
+            if name not in self.raw:
+                self.read(name)
+        return self.raw[name]
+
+    def image(self, name, size=None, alpha=True):
+        key = (name, size, alpha)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if size is not None:
+                base = self.image(name, None, alpha)
+                surface = pygame.transform.scale(base, size)
+            else:
+                raw = self.load(name)
+                if raw is None:
+                    surface = placeholder().convert()
+                else:
+                    surface = raw.convert_alpha() if alpha else raw.convert()
+            self.surfaces[key] = surface
+        return surface
+
+    def sound(self, name):
+        return self.load(name)
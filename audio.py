@@ -0,0 +1,76 @@
+import math
+
+import pygame
+
+
+#plays the sound events a game step leaves behind on a fixed set of reserved channels.
+#zombie groans are ranked by volume so only the loudest few are heard, and each is
+#panned to the side it came from. gunshots get their own channels and a minimum gap
+#so rapid fire can't flood the mixer. does nothing when there is no mixer
+class AudioManager:
+    def __init__(self, shoot_sound, zombie_sound, voices=4, shoot_voices=2,
+                 shoot_gap_ms=60, pan_width=600):
+        self.shoot_sound = shoot_sound
+        self.zombie_sound = zombie_sound
+        self.shoot_gap_ms = shoot_gap_ms
+        self.pan_width = pan_width
+        self.last_shot = None
+        self.next_shot = 0
+        self.enabled = pygame.mixer.get_init() is not None
+        self.shoot_channels = []
+        self.voices = []
+        if self.enabled:
+            #reserved channels are never handed out by Sound.play, so nothing else steals them
+            pygame.mixer.set_reserved(shoot_voices + voices)
+            self.shoot_channels = [pygame.mixer.Channel(i) for i in range(shoot_voices)]
+            self.voices = [pygame.mixer.Channel(shoot_voices + i) for i in range(voices)]
+        self.voice_volume = [0.0] * voices
+
+    def pan(self, volume, dx):
+        #equal power pan, dx is how far right of the listener the sound is
+        side = max(-1.0, min(1.0, dx / self.pan_width))
+        angle = (side + 1) * math.pi / 4
+        return volume * math.cos(angle), volume * math.sin(angle)
+
+    def play(self, events, listener_x, listener_y, now_ms):
+        if not self.enabled:
+            return
+        groans = []
+        shot = False
+        for event in events:
+            if event[0] == "shoot":
+                shot = True
+            elif event[0] == "zombie":
+                groans.append(event)
+
+        if shot and self.shoot_sound is not None and (
+                self.last_shot is None or now_ms - self.last_shot >= self.shoot_gap_ms):
+            channel = self.shoot_channels[self.next_shot]
+            self.next_shot = (self.next_shot + 1) % len(self.shoot_channels)
+            channel.play(self.shoot_sound)
+            self.last_shot = now_ms
+
+        if not groans or self.zombie_sound is None:
+            return
+        #loudest first, only as many as there are voices can possibly be heard
+        groans.sort(key=lambda event: event[3], reverse=True)
+        for _, x, y, volume in groans[:len(self.voices)]:
+            voice = self.pick_voice(volume)
+            if voice is None:
+                break
+            channel = self.voices[voice]
+            channel.play(self.zombie_sound)
+            channel.set_volume(*self.pan(volume, x - listener_x))
+            self.voice_volume[voice] = volume
+
+    def pick_voice(self, volume):
+        #an idle voice if there is one, otherwise cut off the quietest one playing
+        quietest = None
+        for i, channel in enumerate(self.voices):
+            if not channel.get_busy():
+                return i
+            if quietest is None or self.voice_volume[i] < self.voice_volume[quietest]:
+                quietest = i
+        if quietest is not None and self.voice_volume[quietest] < volume:
+            return quietest
+        return None
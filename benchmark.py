@@ -0,0 +1,213 @@
+import argparse, json, math, os, platform, subprocess, sys
+
+#timings shouldn't depend on the desktop, --render draws to an offscreen dummy display.
+#SDL reads these when pygame initialises, so they go first
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from game import Game, Inputs
+from profiler import PhaseTimer
+
+#seeded stress scenarios, run headless and timed per phase so results can be
+#compared between commits:
+#   python benchmark.py --out before.json
+#   python benchmark.py --compare before.json
+
+DT = 1 / 60
+
+
+def make_immortal(game):
+    #scenarios should run their full length, so the player can't die or run dry
+    game.player.health = game.player.max_health = 10 ** 9
+    game.player.reserve_ammo = 10 ** 9
+
+
+def setup_wave(wave):
+    def setup(game):
+        game.wave = wave - 1
+        game.skip_wave()
+    return setup
+
+
+def setup_horde(count):
+    def setup(game):
+        game.enemies = game.spawn_enemies(count)
+    return setup
+
+
+def setup_bullets(game):
+    game.enemies = game.spawn_enemies(50)
+
+
+def setup_boss_rocks(game):
+    #put the player just past a rock with the boss on the far side so it grinds into it
+    rock = next(obj for obj in game.environment_objects if obj.kind == "rock")
+    game.player.world_x = rock.world_x
+    game.player.world_y = rock.world_y + 100
+    game.enemies = game.spawn_enemies(0)
+    game.boss = game.spawn_boss()
+    game.boss.world_x = rock.world_x
+    game.boss.world_y = rock.world_y - 150
+
+
+#scripted player: walks in a square, sweeps the aim round and fires every few frames
+def scripted_inputs(frame, game):
+    leg = (frame // 60) % 4
+    inputs = Inputs(up=leg == 0, right=leg == 1, down=leg == 2, left=leg == 3)
+    inputs.aim = (frame * 0.05) % (2 * math.pi) - math.pi
+    inputs.fire = 1 if frame % 6 == 0 else 0
+    inputs.reload = game.player.bullets_in_mag == 0
+    return inputs
+
+
+def standing_inputs(frame, game):
+    return Inputs(aim=math.pi / 2)
+
+
+#fills the pool back up to 200 live bullets every frame, fanned out round the player
+def bullet_storm_inputs(frame, game):
+    inputs = scripted_inputs(frame, game)
+    player = game.player
+    missing = 200 - len(game.bullets)
+    for i in range(missing):
+        angle = (frame * 0.1 + i * 2 * math.pi / 200) % (2 * math.pi)
+        game.bullets.spawn(player.world_x, player.world_y, angle, game.time)
+    inputs.fire = 0
+    return inputs
+
+
+SCENARIOS = {
+    "wave_1": (None, scripted_inputs),
+    "wave_20": (setup_wave(20), scripted_inputs),
+    "zombies_500": (setup_horde(500), scripted_inputs),
+    "zombies_5000": (setup_horde(5000), scripted_inputs),
+    "bullets_200": (setup_bullets, bullet_storm_inputs),
+    "boss_rocks": (setup_boss_rocks, standing_inputs),
+}
+
+
+def summarise(frames):
+    phases = {}
+    for name in sorted({name for frame in frames for name in frame}):
+        times = np.array([frame.get(name, 0.0) for frame in frames]) * 1000
+        phases[name] = {
+            "mean": float(times.mean()),
+            "p50": float(np.percentile(times, 50)),
+            "p95": float(np.percentile(times, 95)),
+            "p99": float(np.percentile(times, 99)),
+            "max": float(times.max()),
+        }
+    return phases
+
+
+def run_scenario(name, frames, warmup, seed, renderer=None):
+    setup, script = SCENARIOS[name]
+    game = Game(seed=seed)
+    if setup:
+        setup(game)
+    make_immortal(game)
+
+    timer = PhaseTimer()
+    game.profiler = timer
+    if renderer:
+        renderer.profiler = timer
+    for frame in range(warmup + frames):
+        timer.begin_frame()
+        inputs = script(frame, game)
+        timer.mark("input")
+        game.step(inputs, DT)
+        if renderer:
+            renderer.draw(game, game.time)
+        timer.end_frame()
+    return {
+        "frames": frames,
+        "zombies_left": len(game.enemies),
+        "phases": summarise(timer.phase_frames()[warmup:]),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results, baseline):
+    print(f"{'scenario':<14}{'phase':<14}{'mean ms':>10}{'was':>10}{'change':>9}{'p95 ms':>10}{'was':>10}")
+    for name, scenario in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        for phase, stats in scenario["phases"].items():
+            before = old["phases"].get(phase)
+            if not before:
+                continue
+            change = (stats["mean"] / before["mean"] - 1) * 100 if before["mean"] else 0.0
+            print(f"{name:<14}{phase:<14}{stats['mean']:>10.3f}{before['mean']:>10.3f}{change:>8.1f}%"
+                  f"{stats['p95']:>10.3f}{before['p95']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded frame time benchmarks")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--render", action="store_true", help="also draw every frame to an offscreen window")
+    parser.add_argument("--out", help="write the results as json to this file")
+    parser.add_argument("--compare", help="json file from an earlier run to compare against")
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    renderer = None
+    if args.render:
+        #asset paths are relative, same as when the game itself runs
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        from render import Renderer
+        pygame.init()
+        screen = pygame.display.set_mode((1200, 700))
+        renderer = Renderer(screen, pygame.font.SysFont('comicsansms', 30))
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "render": args.render,
+        },
+        "scenarios": {},
+    }
+    for name in names:
+        result = run_scenario(name, args.frames, args.warmup, args.seed, renderer)
+        results["scenarios"][name] = result
+        frame = result["phases"]["frame"]
+        print(f"{name:<14} mean {frame['mean']:.3f} ms  p50 {frame['p50']:.3f}  "
+              f"p95 {frame['p95']:.3f}  p99 {frame['p99']:.3f}", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
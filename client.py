@@ -0,0 +1,316 @@
+import argparse, math, os, random, socket, sys, time
+
+import numpy as np
+
+from game import Inputs, Player, Boss, AmmoBox, HPBox, WORLD_WIDTH, WORLD_HEIGHT, is_player_near_box
+from swarm import EnemySwarm
+from projectiles import BulletPool
+from world import World
+from spatial import build_obstacle_grid
+import netcode
+from netcode import (HELLO, WELCOME, SNAPSHOT, PROTOCOL, DEFAULT_PORT, HELLO_PACKET, WELCOME_PACKET, BYE_PACKET,
+                     BYE, HISTORY, InputSender, Snapshot, SnapshotHistory, decode_zombies, position, angle)
+
+#co-op client. it sends input to the server every frame and draws the snapshots that
+#come back, blending from the one before so the 30 a second still move smoothly.
+#   python client.py --host 192.168.1.10
+#   python client.py --bot --ticks 600      no window, walks about and shoots, for testing
+
+
+#what the Renderer reads, filled in from server snapshots instead of a Game
+class NetState:
+    def __init__(self, world, ammo_box, hp_box, view_width, view_height):
+        self.world = world
+        self.view_width = view_width
+        self.view_height = view_height
+        self.ammo_box = ammo_box
+        self.hp_box = hp_box
+        self.player = Player()
+        self.players = [self.player]
+        self.boss = None
+        self.swarm = EnemySwarm(0)
+        self.bullets = BulletPool(0)
+        self.environment_objects = []
+        self.area = None
+        self.obstacle_grid = None
+        self.score = 0
+        self.wave = 1
+        self.game_over = False
+        self.time = 0.0 #when the latest snapshot arrived, on the perf_counter clock
+
+    def set_centre(self, centre):
+        #the same chunks the server has loaded, made from the world seed
+        if centre != self.world.centre:
+            self.world.load(centre)
+            self.environment_objects = self.world.objects
+            self.area = self.world.bounds()
+            self.obstacle_grid = build_obstacle_grid(self.environment_objects)
+
+    def near_ammo_box(self):
+        return is_player_near_box(self.player.rect(), self.ammo_box.rect())
+
+    def near_hp_box(self):
+        return is_player_near_box(self.player.rect(), self.hp_box.rect())
+
+
+class Client:
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.sender = InputSender()
+        self.history = SnapshotHistory(HISTORY)
+        self.latest_tick = 0
+        self.player_id = None
+        self.state = None
+        self.players = {} #Player for each id the server has sent
+        self.tick_rate = 60
+        self.send_every = 2
+        self.bytes_received = 0
+        self.snapshots_received = 0
+        self.snapshots_dropped = 0
+
+    def connect(self, timeout=5.0):
+        #says hello until the server answers, the hello or the answer can get lost
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            self.socket.sendto(HELLO_PACKET.pack(HELLO, PROTOCOL), self.address)
+            wait_until = time.perf_counter() + 0.25
+            while time.perf_counter() < wait_until:
+                self.receive()
+                if self.state is not None:
+                    return True
+                time.sleep(0.01)
+        return False
+
+    def welcome(self, data):
+        (_, protocol, self.player_id, seed, view_width, view_height, self.tick_rate, self.send_every,
+         ammo_x, ammo_y, hp_x, hp_y) = WELCOME_PACKET.unpack(data)
+        #also sent again when the server starts a new game, so anything from the old one goes
+        self.history.clear()
+        self.latest_tick = 0
+        self.players = {}
+        self.state = NetState(World(seed, WORLD_WIDTH, WORLD_HEIGHT), AmmoBox(ammo_x, ammo_y),
+                              HPBox(hp_x, hp_y), view_width, view_height)
+
+    def receive(self):
+        #reads everything waiting, returns whether a newer snapshot came in
+        updated = False
+        while True:
+            try:
+                data, address = self.socket.recvfrom(4096)
+            except (BlockingIOError, ConnectionResetError):
+                return updated
+            if address != self.address:
+                continue
+            self.bytes_received += len(data)
+            packet_kind = netcode.kind(data)
+            if packet_kind == WELCOME and len(data) == WELCOME_PACKET.size:
+                self.welcome(data)
+            elif packet_kind == SNAPSHOT and self.state is not None:
+                try:
+                    updated = self.apply(Snapshot(data)) or updated
+                except ValueError:
+                    #mangled on the way, the next one replaces it anyway
+                    self.snapshots_dropped += 1
+
+    def apply(self, snapshot):
+        if snapshot.tick <= self.latest_tick:
+            return False #arrived out of order, something newer is already showing
+        if snapshot.baseline:
+            baseline = self.history.get(snapshot.baseline)
+            if baseline is None:
+                #can't rebuild it, the server moves on to a full one once acks stop
+                self.snapshots_dropped += 1
+                return False
+        else:
+            baseline = {}
+        table = decode_zombies(baseline, snapshot.gone, snapshot.moved, snapshot.new)
+        self.history.add(snapshot.tick, table)
+        self.latest_tick = snapshot.tick
+        self.snapshots_received += 1
+        self.update_state(snapshot, table)
+        return True
+
+    def update_state(self, snapshot, table):
+        #the new positions become current and the old ones previous, drawing blends between
+        state = self.state
+        state.time = time.perf_counter()
+        state.score, state.wave, state.game_over = snapshot.score, snapshot.wave, snapshot.game_over
+        state.set_centre(snapshot.centre)
+
+        players = {}
+        for (player_id, x, y, facing, health, max_health, mag, reserve,
+             reloading) in snapshot.players:
+            x, y = float(position(x)), float(position(y))
+            player = self.players.get(player_id)
+            if player is None:
+                player = Player()
+                player.world_x, player.world_y = x, y
+            player.prev_x, player.prev_y = player.world_x, player.world_y
+            player.world_x, player.world_y = x, y
+            player.angle = float(angle(facing))
+            player.health, player.max_health = health, max_health
+            player.bullets_in_mag, player.reserve_ammo, player.is_reloading = mag, reserve, bool(reloading)
+            players[player_id] = player
+            if player_id == self.player_id:
+                state.player = player
+        self.players = players
+        if players:
+            state.players = list(players.values())
+
+        present, x, y, facing, health = snapshot.boss
+        if present:
+            boss = state.boss or Boss(float(position(x)), float(position(y)), state.wave)
+            boss.prev_x, boss.prev_y = boss.world_x, boss.world_y
+            boss.world_x, boss.world_y = float(position(x)), float(position(y))
+            boss.angle = float(angle(facing))
+            boss.health = health
+            state.boss = boss
+        else:
+            state.boss = None
+
+        state.swarm = self.swarm_from(table, state.swarm)
+        bullets = BulletPool(0)
+        bullets.x = bullets.prev_x = position(snapshot.bullets["x"])
+        bullets.y = bullets.prev_y = position(snapshot.bullets["y"])
+        bullets.alive = np.ones(len(snapshot.bullets), dtype=bool)
+        state.bullets = bullets
+
+    def swarm_from(self, table, old):
+        #a fresh swarm holding just the zombies that were sent, each starting from where
+        #the last snapshot had it
+        ids = np.array(sorted(table), dtype=np.int64)
+        values = np.array([table[zombie_id] for zombie_id in ids.tolist()], dtype=float).reshape(-1, 3)
+        swarm = EnemySwarm(ids.size)
+        swarm.x, swarm.y = position(values[:, 0]), position(values[:, 1])
+        swarm.angle = angle(values[:, 2])
+        swarm.alive[:] = True
+        swarm.prev_x, swarm.prev_y = swarm.x.copy(), swarm.y.copy()
+        swarm.ids = ids
+        old_ids = getattr(old, "ids", None)
+        if old_ids is not None and old_ids.size and ids.size:
+            where = np.minimum(np.searchsorted(old_ids, ids), old_ids.size - 1)
+            known = old_ids[where] == ids
+            swarm.prev_x[known] = old.x[where[known]]
+            swarm.prev_y[known] = old.y[where[known]]
+        return swarm
+
+    def send(self, inputs):
+        self.socket.sendto(self.sender.pack(inputs, self.latest_tick), self.address)
+
+    def alpha(self):
+        #how far to blend from the previous snapshot to the latest one
+        interval = self.send_every / self.tick_rate
+        return min(max((time.perf_counter() - self.state.time) / interval, 0.0), 1.0)
+
+    def close(self):
+        try:
+            self.socket.sendto(BYE_PACKET.pack(BYE), self.address)
+        finally:
+            self.socket.close()
+
+
+#stand-in player for testing without anyone at the keyboard: wanders, aims at the
+#nearest zombie it was sent and fires a few times a second
+def bot_inputs(client, rng, frame):
+    state = client.state
+    inputs = Inputs()
+    direction = frame // 90 % 4
+    inputs.up, inputs.right, inputs.down, inputs.left = (direction == i for i in range(4))
+    player, swarm = state.player, state.swarm
+    if len(swarm.x):
+        nearest = int(np.argmin(np.hypot(swarm.x - player.world_x, swarm.y - player.world_y)))
+        inputs.aim = math.atan2(swarm.y[nearest] - player.world_y, swarm.x[nearest] - player.world_x)
+    else:
+        inputs.aim = rng.uniform(-math.pi, math.pi)
+    inputs.fire = int(frame % 10 == 0)
+    inputs.reload = player.bullets_in_mag == 0
+    return inputs
+
+
+def run_bot(client, frames, rate=60):
+    rng = random.Random(client.player_id)
+    start = time.perf_counter()
+    for frame in range(frames):
+        client.receive()
+        client.send(bot_inputs(client, rng, frame))
+        time.sleep(max(0.0, start + (frame + 1) / rate - time.perf_counter()))
+    client.receive()
+    elapsed = time.perf_counter() - start
+    state = client.state
+    print(f"player {client.player_id}: {client.snapshots_received} snapshots, "
+          f"{client.snapshots_dropped} dropped, {client.bytes_received / elapsed / 1024:.1f} KB/s, "
+          f"{client.bytes_received / max(client.snapshots_received, 1):.0f} bytes each, "
+          f"{len(state.swarm.x)} zombies in view, wave {state.wave}, score {state.score}, "
+          f"health {state.player.health}", file=sys.stderr)
+
+
+def run_window(client):
+    import pygame
+    from render import Renderer
+    from assets import AssetManager
+
+    pygame.init()
+    state = client.state
+    screen = pygame.display.set_mode((state.view_width, state.view_height))
+    pygame.display.set_caption(f"Zombie Shooter - player {client.player_id}")
+    font = pygame.font.SysFont('comicsansms', 30)
+    clock = pygame.time.Clock()
+    renderer = Renderer(screen, font, assets=AssetManager())
+    width, height = screen.get_size()
+
+    while True:
+        clock.tick(60)
+        keys = pygame.key.get_pressed()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        inputs = Inputs(up=keys[pygame.K_w], down=keys[pygame.K_s],
+                        left=keys[pygame.K_a], right=keys[pygame.K_d])
+        inputs.aim = math.atan2(mouse_y - height // 2, mouse_x - width // 2)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                inputs.fire += 1
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_t:
+                    inputs.next_wave = True
+                if event.key == pygame.K_r:
+                    inputs.reload = True
+                if event.key == pygame.K_f:
+                    inputs.buy = True
+        client.send(inputs)
+        client.receive()
+        state = client.state
+        if state.game_over:
+            renderer.draw_game_over()
+        elif state.area is not None:
+            renderer.draw(state, pygame.time.get_ticks(), client.alpha())
+        pygame.display.update()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join a co-op server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bot", action="store_true", help="play without a window, for testing")
+    parser.add_argument("--ticks", type=int, default=600, help="how long a bot plays for")
+    args = parser.parse_args()
+    if args.bot:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    client = Client(args.host, args.port)
+    if not client.connect():
+        print(f"no answer from {args.host}:{args.port}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        if args.bot:
+            run_bot(client, args.ticks)
+        else:
+            run_window(client)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,578 @@
+import math, random
+
+import numpy as np
+import pygame
+
+from spatial import BucketGrid, build_obstacle_grid
+from swarm import EnemySwarm
+from navigation import FlowField
+from spawner import Spawner
+from world import World
+from projectiles import BulletPool
+from profiler import NULL_TIMER
+from scheduler import Scheduler
+
+#the simulation side of the game, nothing in here needs a window or a sound card
+#so it can be stepped headless. Main.py draws whatever state this leaves behind
+
+#map size, only the chunks around the player are ever loaded so this can be big
+WORLD_WIDTH = 12000
+WORLD_HEIGHT = 8000
+
+#speeds below are per tick at this rate, step() scales them by the real dt
+TICK_RATE = 60
+
+
+#one tick worth of player input, filled in by whoever is driving the game
+class Inputs:
+    def __init__(self, up=False, down=False, left=False, right=False, aim=0.0,
+                 fire=0, reload=False, buy=False, next_wave=False):
+        self.up = up
+        self.down = down
+        self.left = left
+        self.right = right
+        self.aim = aim #angle from the player to the mouse, in radians
+        self.fire = fire #number of clicks this tick
+        self.reload = reload
+        self.buy = buy
+        self.next_wave = next_wave
+
+    def merge(self, newer):
+        #folds in a later frame's input, held keys and aim are replaced, presses add up
+        self.up, self.down, self.left, self.right = newer.up, newer.down, newer.left, newer.right
+        self.aim = newer.aim
+        self.fire += newer.fire
+        self.reload = self.reload or newer.reload
+        self.buy = self.buy or newer.buy
+        self.next_wave = self.next_wave or newer.next_wave
+
+    def held(self):
+        #what carries over to the next tick once this one has used the presses
+        return Inputs(self.up, self.down, self.left, self.right, self.aim)
+
+
+class Player:
+    def __init__(self):
+        self.world_x = WORLD_WIDTH // 2
+        self.world_y = WORLD_HEIGHT // 2
+        self.prev_x = self.world_x
+        self.prev_y = self.world_y
+        self.speed = 5
+        self.angle = 0
+        self.size = 40
+        self.health = 100
+        self.max_health = 100
+        self.mag_capacity = 30
+        self.bullets_in_mag = self.mag_capacity
+        self.reserve_ammo = 240
+        self.is_reloading = False
+        self.reload_start_time = 0
+        self.reload_duration = 1500
+        self.reload_timer = None
+
+    def move(self, inputs, obstacles, scale=1.0):
+        dx, dy = 0, 0
+        step = self.speed * scale
+        if inputs.up: dy -= step
+        if inputs.down: dy += step
+        if inputs.left: dx -= step
+        if inputs.right: dx += step
+
+        new_x = self.world_x + dx
+        new_y = self.world_y + dy
+
+
+        half_size = self.size // 2
+        new_x = max(half_size, min(WORLD_WIDTH - half_size, new_x))
+        new_y = max(half_size, min(WORLD_HEIGHT - half_size, new_y))
+
+        new_rect = pygame.Rect(new_x - half_size,
+                               new_y - half_size,
+                               self.size, self.size)
+
+        if not obstacles.collides(new_rect):
+            self.world_x = new_x
+            self.world_y = new_y
+
+    def take_damage(self, amount):
+        self.health -= amount
+        if self.health <= 0:
+            self.health = 0
+
+    def heal(self, amount):
+        self.health += amount
+        if self.health > self.max_health:
+            self.health = self.max_health
+
+    def reload(self, now):
+        #returns whether a reload started, the game books finish_reload for when it's done
+        if self.bullets_in_mag < self.mag_capacity and self.reserve_ammo > 0:
+            self.is_reloading = True
+            self.reload_start_time = now
+            return True
+        return False
+
+    def finish_reload(self):
+        needed = self.mag_capacity - self.bullets_in_mag
+        to_reload = min(needed, self.reserve_ammo)
+        self.bullets_in_mag += to_reload
+        self.reserve_ammo -= to_reload
+        self.is_reloading = False
+
+    def rect(self):
+        return pygame.Rect(self.world_x - self.size // 2, self.world_y - self.size // 2, self.size, self.size)
+
+
+class Enemy:
+    #thin view over one slot of the swarm arrays, movement happens in swarm.update
+    def __init__(self, swarm, x, y, index=None):
+        self.swarm = swarm
+        self.size = 30
+        self.speed = 3
+        if index is None:
+            index = swarm.spawn(x, y, self.speed, self.size)
+        #an index means the slot is already filled in, like when loading a snapshot
+        self.index = index
+        swarm.owners[index] = self
+        self.move_sound_cooldown = 0 #when it can groan again, a timer sets sound_ready then
+        self.sound_ready = True
+
+    @property
+    def world_x(self):
+        return float(self.swarm.x[self.index])
+
+    @world_x.setter
+    def world_x(self, value):
+        self.swarm.x[self.index] = value
+
+    @property
+    def world_y(self):
+        return float(self.swarm.y[self.index])
+
+    @world_y.setter
+    def world_y(self, value):
+        self.swarm.y[self.index] = value
+
+    @property
+    def angle(self):
+        return float(self.swarm.angle[self.index])
+
+    @angle.setter
+    def angle(self, value):
+        self.swarm.angle[self.index] = value
+
+    @property
+    def alive(self):
+        return bool(self.swarm.alive[self.index])
+
+    def kill(self):
+        self.swarm.kill(self.index)
+
+    def play_zombie_sound(self, player, now, events, timers):
+        if not self.sound_ready:
+            return  # still cooling down, skip playing sound
+
+        max_hearing_distance = 500
+        dx = self.world_x - player.world_x
+        dy = self.world_y - player.world_y
+        distance = math.sqrt(dx * dx + dy * dy)
+
+        if distance < max_hearing_distance:
+            volume = max(0.0, 0.5 - distance / max_hearing_distance)
+            events.append(("zombie", self.world_x, self.world_y, volume))
+            self.move_sound_cooldown = now + 2000
+            self.sound_ready = False
+            timers.at(self.move_sound_cooldown, self.sound_cooled)
+
+    def sound_cooled(self):
+        self.sound_ready = True
+
+    def rect(self):
+        return pygame.Rect(self.world_x - self.size//2, self.world_y - self.size//2, self.size, self.size)
+
+
+class Boss:
+    def __init__(self, x, y, wave):
+        self.world_x = self.prev_x = x
+        self.world_y = self.prev_y = y
+        self.size = 80
+        self.base_health = 300
+        self.health = self.base_health + (wave -1) * 100
+        self.speed = 1.2
+        self.angle = 0
+
+    def move_toward(self, player, obstacles, scale=1.0):
+        dx = player.world_x - self.world_x
+        dy = player.world_y - self.world_y
+        self.angle = math.atan2(dy, dx)
+        move_x = self.speed * scale * math.cos(self.angle)
+        move_y = self.speed * scale * math.sin(self.angle)
+        new_rect = pygame.Rect(self.world_x + move_x - self.size // 2,
+                               self.world_y + move_y - self.size // 2,
+                               self.size, self.size)
+        if not obstacles.collides(new_rect):
+            self.world_x += move_x
+            self.world_y += move_y
+
+    def rect(self):
+        return pygame.Rect(self.world_x - self.size // 2, self.world_y - self.size // 2, self.size, self.size)
+
+
+class AmmoBox:
+    def __init__(self, x, y):
+        self.world_x = x
+        self.world_y = y
+
+    def rect(self):
+        # For proximity detection
+        return pygame.Rect(self.world_x - 10, self.world_y - 10, 20, 20)
+
+
+class HPBox:
+    def __init__(self, x, y):
+        self.world_x = x
+        self.world_y = y
+
+    def rect(self):
+        return pygame.Rect(self.world_x - 10, self.world_y - 10, 20, 20)
+
+
+# Check if the player is within proximity pixels of a box rect
+def is_player_near_box(player_rect, box_rect, proximity=50):
+    distance = player_rect.centerx - box_rect.centerx, player_rect.centery - box_rect.centery
+    dist_squared = distance[0]**2 + distance[1]**2
+    return dist_squared <= proximity**2
+
+
+class Game:
+    def __init__(self, seed=None, view_width=1200, view_height=700):
+        #all gameplay randomness goes through this so a seed reproduces a run
+        self.rng = random.Random(seed)
+        self.view_width = view_width
+        self.view_height = view_height
+        self.time = 0.0 #game clock in milliseconds, only moves when step() runs
+        self.events = []
+        self.profiler = NULL_TIMER
+        #reloads, bullet expiry, zombie sound cooldowns and the break between waves
+        #run off timers on the game clock instead of being checked every tick
+        self.timers = Scheduler()
+        self.wave_timer = None
+
+        #some data/information for the game
+        self.player = Player()
+        #everyone playing, the first is self.player. only co-op has more than one
+        self.players = [self.player]
+        self.bullets = BulletPool(speed=40, size=5, lifetime=5000, timers=self.timers)
+        self.swarm = EnemySwarm()
+        self.enemy_grid = BucketGrid()
+        self.enemies = []
+        self.score = 0
+        self.wave = 1
+        self.wave_start_time = 0
+        self.wave_delay = 5000 #5 seconds
+        self.next_wave_triggered = False
+        self.environment_objects = []
+        self.boss = None
+        self.game_over = False
+
+        #the shop boxes sit near where the player starts
+        spread = 800
+        start_x, start_y = self.player.world_x, self.player.world_y
+        self.ammo_box = AmmoBox(self.rng.randint(start_x - spread, start_x + spread),
+                                self.rng.randint(start_y - spread, start_y + spread))
+        self.hp_box = HPBox(self.rng.randint(start_x - spread, start_x + spread),
+                            self.rng.randint(start_y - spread, start_y + spread))
+
+        #trees and rocks come from the world chunks around the player
+        self.world = World(self.rng.getrandbits(32), WORLD_WIDTH, WORLD_HEIGHT)
+        #spawn points are picked per loaded area, zombies then stream in a few per tick
+        self.spawner = Spawner(self.rng)
+        self.update_world()
+        self.start_wave(5)
+
+    #co-op players join next to the first one
+    def add_player(self):
+        leader = self.player
+        player = Player()
+        player.world_x = player.prev_x = leader.world_x + 60 * len(self.players)
+        player.world_y = player.prev_y = leader.world_y
+        self.players.append(player)
+        return player
+
+    def remove_player(self, player):
+        #there is always someone left, the game ends rather than running with nobody
+        if len(self.players) > 1:
+            self.players.remove(player)
+            if player.reload_timer:
+                player.reload_timer.cancel()
+            self.player = self.players[0]
+
+    def alive_players(self):
+        return [player for player in self.players if player.health > 0]
+
+    def nearest_players(self, xs, ys, players):
+        #the closest of players to each position, in one numpy pass for the whole horde
+        if len(players) == 1:
+            return players * len(xs)
+        dist = np.hypot(np.subtract.outer(xs, [player.world_x for player in players]),
+                        np.subtract.outer(ys, [player.world_y for player in players]))
+        return [players[i] for i in np.argmin(dist, axis=1).tolist()]
+
+    #called after the players move, everything built from the obstacles follows the loaded
+    #area. in co-op it stays on the middle of the group and nobody can walk out of it
+    def update_world(self):
+        players = self.alive_players() or self.players
+        x = sum(player.world_x for player in players) / len(players)
+        y = sum(player.world_y for player in players) / len(players)
+        if self.world.update(x, y):
+            self.load_area()
+        if len(self.players) > 1:
+            area = self.area
+            margin_x, margin_y = self.view_width // 2, self.view_height // 2
+            for player in self.players:
+                player.world_x = max(area.left + margin_x, min(area.right - margin_x, player.world_x))
+                player.world_y = max(area.top + margin_y, min(area.bottom - margin_y, player.world_y))
+
+    def load_area(self):
+        self.environment_objects = self.world.objects
+        self.area = area = self.world.bounds()
+        self.obstacle_grid = build_obstacle_grid(self.environment_objects)
+        #shared path toward the player for the whole horde, grown by half a zombie
+        self.flow_field = FlowField(area,
+                                    [obj.world_collision_rect for obj in self.environment_objects
+                                     if obj.world_collision_rect],
+                                    clearance=15)
+        self.spawner.build(self.obstacle_grid, area)
+
+    #replaces the current zombies with a fresh wave that arrives over the next few ticks
+    def start_wave(self, count):
+        self.swarm.clear()
+        self.enemies = []
+        self.spawner.reset()
+        self.spawner.queue(count)
+
+    #replaces the current zombies with count new ones straight away
+    def spawn_enemies(self, count):
+        self.swarm.clear()
+        self.spawner.reset()
+        return [Enemy(self.swarm, x, y) for x, y in self.spawn_points(count)]
+
+    def spawn_points(self, count):
+        #off every screen and away from every player
+        players = self.alive_players() or self.players
+        return self.spawner.take(count, [self.view_rect(player) for player in players],
+                                 [player.world_x for player in players],
+                                 [player.world_y for player in players], self.boss)
+
+    def update_spawns(self):
+        count = self.spawner.due()
+        if count:
+            self.enemies.extend(Enemy(self.swarm, x, y) for x, y in self.spawn_points(count))
+
+    def spawn_boss(self):
+        (x, y), = self.spawn_points(1)
+        return Boss(x, y, self.wave)
+
+    def camera(self, player=None):
+        #top left of the view, the player is always in the middle of the screen
+        player = player or self.player
+        return (int(player.world_x) - self.view_width // 2,
+                int(player.world_y) - self.view_height // 2)
+
+    def view_rect(self, player=None):
+        camera_x, camera_y = self.camera(player)
+        return pygame.Rect(camera_x, camera_y, self.view_width, self.view_height)
+
+    def near_ammo_box(self, player=None):
+        return is_player_near_box((player or self.player).rect(), self.ammo_box.rect())
+
+    def near_hp_box(self, player=None):
+        return is_player_near_box((player or self.player).rect(), self.hp_box.rect())
+
+    def fire(self, angle, player=None):
+        player = player or self.player
+        if player.is_reloading or player.bullets_in_mag <= 0:
+            return
+        offset = 30
+        bx = player.world_x + math.cos(angle) * offset
+        by = player.world_y + math.sin(angle) * offset
+        self.bullets.spawn(bx, by, angle, self.time)
+        player.bullets_in_mag -= 1
+        self.events.append(("shoot",))
+
+    def skip_wave(self):
+        self.wave += 1
+        self.start_wave(5 + self.wave * 2)
+        #a break that was already counting down belongs to the wave that was skipped
+        if self.wave_timer:
+            self.wave_timer.cancel()
+            self.wave_timer = None
+        self.next_wave_triggered = False
+
+    def reload(self, player=None):
+        player = player or self.player
+        if player.reload(self.time):
+            #pressing reload again starts it over
+            if player.reload_timer:
+                player.reload_timer.cancel()
+            player.reload_timer = self.timers.at(self.time + player.reload_duration, player.finish_reload)
+
+    def buy(self, player=None):
+        player = player or self.player
+        if self.near_ammo_box(player):
+            ammo_to_add = 100
+            cost = 200
+            max_reserve = 240
+            if player.reserve_ammo < max_reserve and self.score >= cost:
+                added_ammo = min(ammo_to_add, max_reserve - player.reserve_ammo)
+                player.reserve_ammo += added_ammo
+                self.score -= cost
+        elif self.near_hp_box(player):
+            cost = 500
+            if self.score >= cost:
+                player.health = min(player.health + 100, player.max_health + 100)
+                player.max_health += 100
+                self.score -= cost
+
+    def step(self, inputs, dt):
+        #advances the game by dt seconds, sounds to play are left in self.events.
+        #inputs is the first player's, or a list with one per player in co-op
+        self.events = []
+        if self.game_over:
+            return
+        if isinstance(inputs, Inputs):
+            inputs = [inputs]
+        self.time += dt * 1000
+        scale = dt * TICK_RATE
+        self.save_previous()
+        self.timers.run(self.time)
+
+        #the dead sit out until everyone is
+        playing = [(player, player_inputs) for player, player_inputs in zip(self.players, inputs)
+                   if player.health > 0]
+        for player, player_inputs in playing:
+            self.act(player, player_inputs)
+        profiler = self.profiler
+        profiler.mark("actions")
+
+        # Movement
+        for player, player_inputs in playing:
+            player.move(player_inputs, self.obstacle_grid, scale)
+            player.angle = player_inputs.aim
+        self.update_world()
+        profiler.mark("player")
+
+        self.update_bullets(scale)
+        profiler.mark("bullets")
+        self.update_enemies(scale)
+        profiler.mark("enemies")
+        self.update_wave()
+        profiler.mark("wave")
+
+        if not self.alive_players():
+            self.game_over = True
+
+    def act(self, player, inputs):
+        for _ in range(inputs.fire):
+            self.fire(inputs.aim, player)
+        if inputs.next_wave:
+            self.skip_wave()
+        if inputs.reload:
+            self.reload(player)
+        if inputs.buy:
+            self.buy(player)
+
+    #where everything was before this tick, the renderer blends from there to the new state
+    def save_previous(self):
+        for player in self.players:
+            player.prev_x, player.prev_y = player.world_x, player.world_y
+        if self.boss:
+            self.boss.prev_x, self.boss.prev_y = self.boss.world_x, self.boss.world_y
+        self.swarm.save_previous()
+
+    def update_bullets(self, scale):
+        # Bullets, zombies are bucketed once per tick so each bullet only checks its neighbourhood
+        #bullets last until they leave every player's screen
+        views = [self.view_rect(player) for player in self.players]
+        self.bullets.update(views[0].unionall(views[1:]), scale)
+        self.swarm.build_grid(self.enemy_grid)
+        self.score += 10 * self.bullets.hit_swarm(self.swarm, self.enemy_grid)
+
+        boss = self.boss
+        if boss:
+            hits = self.bullets.hit_rect(boss.rect(), limit=math.ceil(boss.health / 20))
+            boss.health -= 20 * hits
+            if boss.health <= 0:
+                self.score += 100
+                self.boss = None
+
+    def update_enemies(self, scale):
+        # Enemy attacks, each zombie goes for whoever is closest
+        players = self.alive_players()
+        targets_x = [player.world_x for player in players]
+        targets_y = [player.world_y for player in players]
+        swarm = self.swarm
+        self.flow_field.update(targets_x, targets_y)
+        swarm.update(targets_x, targets_y, self.obstacle_grid, scale, self.flow_field)
+        # only zombies in the near band can be heard or reach a player
+        near = swarm.near_slots()
+        listeners = self.nearest_players(swarm.x[near], swarm.y[near], players)
+        for slot, listener in zip(near.tolist(), listeners):
+            swarm.owners[slot].play_zombie_sound(listener, self.time, self.events, self.timers)
+        for player in players:
+            for slot in swarm.overlapping(near[swarm.alive[near]], player.rect()):
+                player.take_damage(10)
+                swarm.kill(slot)
+
+        # dead zombies are only flagged above, drop them in one pass
+        if len(self.enemies) != swarm.count():
+            self.enemies = [enemy for enemy in self.enemies if enemy.alive]
+
+        boss = self.boss
+        if boss:
+            target, = self.nearest_players([boss.world_x], [boss.world_y], players)
+            boss.move_toward(target, self.obstacle_grid, scale)
+            boss_rect = boss.rect()
+            for player in players:
+                if boss_rect.colliderect(player.rect()):
+                    player.take_damage(25)
+
+    def update_wave(self):
+        # Queued zombies come in first so a wave still streaming in isn't over yet
+        self.update_spawns()
+        # Wave logic, the next wave comes from a timer once this one is cleared
+        if self.wave_cleared() and not self.next_wave_triggered:
+            self.wave_start_time = self.time
+            self.next_wave_triggered = True
+            self.wave_timer = self.timers.at(self.time + self.wave_delay, self.next_wave)
+
+    def wave_cleared(self):
+        return len(self.enemies) == 0 and self.boss is None and not self.spawner.pending
+
+    def next_wave(self):
+        self.wave += 1
+        if self.wave % 5 == 0:
+            self.boss = self.spawn_boss()
+        self.start_wave(5 + self.wave * 2)
+        self.next_wave_triggered = False
+        self.wave_timer = None
+
+    #timers point at live objects so snapshots don't keep them, a loaded game
+    #books them again from the times that were saved
+    def restart_timers(self):
+        timers = self.timers
+        timers.clear()
+        self.wave_timer = None
+        for player in self.players:
+            player.reload_timer = None
+            if player.is_reloading:
+                player.reload_timer = timers.at(player.reload_start_time + player.reload_duration,
+                                                player.finish_reload)
+        for enemy in self.enemies:
+            enemy.sound_ready = enemy.move_sound_cooldown <= self.time
+            if not enemy.sound_ready:
+                timers.at(enemy.move_sound_cooldown, enemy.sound_cooled)
+        self.bullets.schedule_expiry()
+        self.next_wave_triggered = self.next_wave_triggered and self.wave_cleared()
+        if self.next_wave_triggered:
+            self.wave_timer = timers.at(self.wave_start_time + self.wave_delay, self.next_wave)
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+WHITE = (255, 255, 255)
+BLUE = (0, 0, 255)
+ORANGE = (255, 165, 0)
+
+AMMO_PROMPT = "200 points for 100 bullets, press F to buy"
+HP_PROMPT = "500 points for +100 HP, press F to buy"
+
+
+#rendered text surfaces keyed by string and colour, least recently used ones go first.
+#pinned strings are rendered up front and never evicted
+class TextCache:
+    def __init__(self, font, max_size=128):
+        self.font = font
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.pinned = {}
+
+    def pin(self, text, colour):
+        self.pinned[(text, colour)] = self.font.render(text, True, colour)
+
+    def render(self, text, colour):
+        key = (text, colour)
+        surface = self.pinned.get(key)
+        if surface is not None:
+            return surface
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font.render(text, True, colour)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+#score, wave, health and ammo readouts. each field keeps the surface for its
+#last value so nothing is even looked up until the number actually changes
+class Hud:
+    def __init__(self, font):
+        self.text = TextCache(font)
+        self.text.pin(AMMO_PROMPT, WHITE)
+        self.text.pin(HP_PROMPT, WHITE)
+        self.text.pin("Game Over!", WHITE)
+        self.fields = {}
+        self.message = None
+        self.message_until = 0
+
+    def show_message(self, text, until_ms):
+        #one line across the top of the screen until the given pygame.time.get_ticks()
+        self.message = text
+        self.message_until = until_ms
+
+    def field(self, name, text, colour):
+        last = self.fields.get(name)
+        if last is None or last[0] != text:
+            last = (text, self.text.render(text, colour))
+            self.fields[name] = last
+        return last[1]
+
+    def draw(self, screen, game, camera_x, camera_y, now_ms=0):
+        player = game.player
+        #UI
+        screen.blit(self.field("score", f"Score: {game.score}", WHITE), (20, 20))
+        screen.blit(self.field("wave", f"Wave: {game.wave}", WHITE), (20, 60))
+        screen.blit(self.field("health", f"Health: {player.health}", BLUE), (20, 100))
+        screen.blit(self.field("ammo", f"Ammo: {player.bullets_in_mag} / {player.reserve_ammo}", ORANGE), (20, 140))
+
+        if game.near_ammo_box():
+            ammo_box_rect = game.ammo_box.rect()
+            info_text = self.text.render(AMMO_PROMPT, WHITE)
+            screen.blit(info_text, (ammo_box_rect.x - camera_x - 40, ammo_box_rect.y - camera_y - 30))
+        elif game.near_hp_box():
+            hp_box_rect = game.hp_box.rect()
+            info_text = self.text.render(HP_PROMPT, WHITE)
+            screen.blit(info_text, (hp_box_rect.x - camera_x - 40, hp_box_rect.y - camera_y - 30))
+
+        if self.message and now_ms < self.message_until:
+            message = self.text.render(self.message, WHITE)
+            screen.blit(message, (screen.get_width() // 2 - message.get_width() // 2, 20))
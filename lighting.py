@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pygame
+
+from projectiles import segment_box_entry
+
+
+#darkens the screen everywhere except the flashlight cone.
+#the overlay is one persistent surface that is only redrawn when the cone changes,
+#and it is applied as an rgb multiply which is much cheaper than a full screen alpha blit.
+#with shadows on the rays stop at obstacle hitboxes so trees and rocks block the light
+class Flashlight:
+    def __init__(self, width, height, radius=600, cone_angle=math.pi / 3, num_rays=60,
+                 darkness=150, angle_step_degrees=1, shadows=False, shadow_rays=120, penetration=20):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.cone_angle = cone_angle
+        self.num_rays = num_rays
+        self.step = math.radians(angle_step_degrees)
+        self.shadows = shadows
+        self.shadow_rays = shadow_rays
+        #how far light carries into an obstacle so its near face is still lit
+        self.penetration = penetration
+        #multiplying by this matches blending black at the old alpha of 150
+        shade = 255 - darkness
+        self.shade = (shade, shade, shade)
+        self.overlay = pygame.Surface((width, height)).convert()
+        self.cones = {}
+        self.key = None
+
+    def bucket(self, angle):
+        return int(round(angle / self.step)) % int(round(2 * math.pi / self.step))
+
+    def cone(self, bucket):
+        #screen space cone outline for an angle bucket, the trig only ever runs once per bucket
+        points = self.cones.get(bucket)
+        if points is None:
+            px, py = self.width // 2, self.height // 2
+            start_angle = bucket * self.step - self.cone_angle / 2
+            ray_step = self.cone_angle / self.num_rays
+            points = [(px, py)]
+            for i in range(self.num_rays + 1):
+                angle = start_angle + i * ray_step
+                points.append((px + self.radius * math.cos(angle), py + self.radius * math.sin(angle)))
+            self.cones[bucket] = points
+        return points
+
+    def shadowed_cone(self, bucket, world_x, world_y, obstacles):
+        #casts every ray against nearby hitboxes and cuts it short at the first one
+        radius = self.radius
+        area = pygame.Rect(world_x - radius, world_y - radius, radius * 2, radius * 2)
+        rects = obstacles.nearby(area)
+        if not rects:
+            return self.cone(bucket)
+        angles = (bucket * self.step - self.cone_angle / 2 +
+                  np.arange(self.shadow_rays + 1) * (self.cone_angle / self.shadow_rays))
+        dx = np.cos(angles) * radius
+        dy = np.sin(angles) * radius
+        edges = np.array([(r.left, r.top, r.right, r.bottom) for r in rects], dtype=float)
+        #every ray against every rect at once, rays along the first axis
+        t = segment_box_entry(world_x, world_y, world_x + dx[:, None], world_y + dy[:, None],
+                              edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3])
+        #a hitbox the ray starts inside doesn't block it, otherwise the player standing
+        #against a rock would turn the whole light off
+        t = np.where(t > 0, t, np.nan)
+        t = np.fmin.reduce(t, axis=1, initial=np.inf)
+        length = np.minimum(t * radius + self.penetration, radius)
+        px, py = self.width // 2, self.height // 2
+        return [(px, py)] + list(zip((px + np.cos(angles) * length).tolist(),
+                                     (py + np.sin(angles) * length).tolist()))
+
+    def draw(self, screen, angle, world_x=0, world_y=0, obstacles=None):
+        bucket = self.bucket(angle)
+        shadows = self.shadows and obstacles is not None
+        key = (bucket, int(world_x), int(world_y)) if shadows else bucket
+        if key != self.key:
+            if shadows:
+                points = self.shadowed_cone(bucket, world_x, world_y, obstacles)
+            else:
+                points = self.cone(bucket)
+            self.overlay.fill(self.shade)
+            pygame.draw.polygon(self.overlay, (255, 255, 255), points)
+            self.key = key
+        screen.blit(self.overlay, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
@@ -0,0 +1,76 @@
+import numpy as np
+import pygame
+
+WHITE = (255, 255, 255)
+GREEN = (0, 200, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+
+#offsets of every pixel in a filled circle, used to stamp all markers at once
+def disc(radius):
+    return [(dx, dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+            if dx * dx + dy * dy <= radius * radius + radius]
+
+
+#minimap of the loaded area drawn from a cached background with the obstacles on it and
+#a marker layer that is only rebuilt a few times a second. zombie markers are stamped into
+#the pixels with numpy, so the cost depends on the map size and not the horde size
+class Minimap:
+    def __init__(self, area, obstacles, max_width=200, max_height=140, update_hz=12):
+        #same scale both ways, the map is as big as fits in the max size
+        scale = min(max_width / area.width, max_height / area.height)
+        self.left = area.left
+        self.top = area.top
+        self.width = int(area.width * scale)
+        self.height = int(area.height * scale)
+        self.scale_x = self.scale_y = scale
+        self.update_ms = 1000 / update_hz
+        self.last_update = None
+        self.marker = disc(2)
+
+        self.background = pygame.Surface((self.width, self.height))
+        self.background.fill((40, 40, 40))
+        for obj in obstacles:
+            if obj.world_collision_rect:
+                colour = (30, 90, 30) if obj.is_tree else (110, 110, 110)
+                rect = obj.world_collision_rect
+                mx, my = self.to_map(rect.x, rect.y)
+                pygame.draw.rect(self.background, colour,
+                                 (mx, my, max(2, int(rect.width * self.scale_x)), max(2, int(rect.height * self.scale_y))))
+        self.surface = self.background.copy()
+
+    def to_map(self, x, y):
+        return int((x - self.left) * self.scale_x), int((y - self.top) * self.scale_y)
+
+    def update(self, game):
+        self.surface.blit(self.background, (0, 0))
+        swarm = game.swarm
+        slots = swarm.alive_slots()
+        if slots.size:
+            mx = np.floor((swarm.x[slots] - self.left) * self.scale_x).astype(np.int64)
+            my = np.floor((swarm.y[slots] - self.top) * self.scale_y).astype(np.int64)
+            inside = (mx >= 0) & (mx < self.width) & (my >= 0) & (my < self.height)
+            occupied = np.zeros((self.width, self.height), dtype=bool)
+            occupied[mx[inside], my[inside]] = True
+            #grow every occupied pixel into a small disc by or-ing shifted copies
+            markers = np.zeros_like(occupied)
+            for dx, dy in self.marker:
+                markers[max(dx, 0):self.width + min(dx, 0), max(dy, 0):self.height + min(dy, 0)] |= \
+                    occupied[max(-dx, 0):self.width + min(-dx, 0), max(-dy, 0):self.height + min(-dy, 0)]
+            pixels = pygame.surfarray.pixels3d(self.surface)
+            pixels[markers] = GREEN
+            del pixels
+        if game.boss:
+            pygame.draw.circle(self.surface, RED, self.to_map(game.boss.world_x, game.boss.world_y), 5)
+
+    def draw(self, screen, game, now_ms):
+        if self.last_update is None or now_ms - self.last_update >= self.update_ms:
+            self.update(game)
+            self.last_update = now_ms
+        x, y = screen.get_width() - self.width - 10, 10
+        screen.blit(self.surface, (x, y))
+        #the player marker is one circle so it stays live every frame
+        px, py = self.to_map(game.player.world_x, game.player.world_y)
+        pygame.draw.circle(screen, BLUE, (x + px, y + py), 4)
+        pygame.draw.rect(screen, WHITE, (x, y, self.width, self.height), 2)
@@ -0,0 +1,107 @@
+import math
+from collections import deque
+
+import numpy as np
+
+#neighbour offsets, orthogonal ones first
+STEPS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+#one shared flow field toward the player over a grid of the loaded area.
+#the distance map is only rebuilt when the player walks into a new cell, and every
+#zombie then just looks up the direction stored for the cell it is standing in.
+#with several players the search starts from all of them, so it leads to the closest
+class FlowField:
+    def __init__(self, area, obstacles, cell_size=40, clearance=15):
+        self.left = area.left
+        self.top = area.top
+        self.cell_size = cell_size
+        self.cols = math.ceil(area.width / cell_size)
+        self.rows = math.ceil(area.height / cell_size)
+        self.target = None
+
+        #a cell is blocked when a zombie anywhere in it could touch an obstacle
+        self.blocked = np.zeros((self.cols, self.rows), dtype=bool)
+        for rect in obstacles:
+            x0 = max(0, (rect.left - clearance - self.left) // cell_size)
+            x1 = min(self.cols - 1, (rect.right + clearance - self.left) // cell_size)
+            y0 = max(0, (rect.top - clearance - self.top) // cell_size)
+            y1 = min(self.rows - 1, (rect.bottom + clearance - self.top) // cell_size)
+            if x0 <= x1 and y0 <= y1:
+                self.blocked[x0:x1 + 1, y0:y1 + 1] = True
+
+        self.distance = np.full((self.cols, self.rows), np.inf)
+        self.dir_x = np.zeros((self.cols, self.rows))
+        self.dir_y = np.zeros((self.cols, self.rows))
+        self.valid = np.zeros((self.cols, self.rows), dtype=bool)
+
+    def cell(self, x, y):
+        cx = min(max(int((x - self.left) // self.cell_size), 0), self.cols - 1)
+        cy = min(max(int((y - self.top) // self.cell_size), 0), self.rows - 1)
+        return cx, cy
+
+    def update(self, target_x, target_y):
+        #a position or lists of them, one per player
+        target = tuple(sorted({self.cell(x, y) for x, y in zip(np.atleast_1d(target_x),
+                                                              np.atleast_1d(target_y))}))
+        if target != self.target:
+            self.target = target
+            self.rebuild(target)
+
+    def rebuild(self, target):
+        #breadth first search out from the players' cells. the grid gets a blocked border
+        #so every neighbour is just an index offset with no bounds checks
+        stride = self.rows + 2
+        padded = np.pad(self.blocked, 1, constant_values=True)
+        dist = np.where(padded, -2, -1).ravel().tolist()
+        queue = deque()
+        for cx, cy in target:
+            start = (cx + 1) * stride + cy + 1
+            dist[start] = 0
+            queue.append(start)
+        while queue:
+            index = queue.popleft()
+            next_dist = dist[index] + 1
+            for n in (index + 1, index - 1, index + stride, index - stride):
+                if dist[n] == -1:
+                    dist[n] = next_dist
+                    queue.append(n)
+        distance = np.array(dist, dtype=float).reshape(self.cols + 2, self.rows + 2)[1:-1, 1:-1]
+        distance[distance < 0] = np.inf
+        self.distance = distance
+
+        #each cell points at its closest neighbour, diagonals only when both sides are open
+        padded = np.pad(distance, 1, constant_values=np.inf)
+        open_cells = np.pad(~self.blocked, 1, constant_values=False)
+        best = distance.copy()
+        dir_x = np.zeros_like(distance)
+        dir_y = np.zeros_like(distance)
+        cols, rows = self.cols, self.rows
+        for dx, dy in STEPS:
+            neighbour = padded[1 + dx:1 + dx + cols, 1 + dy:1 + dy + rows]
+            if dx and dy:
+                corner_ok = (open_cells[1 + dx:1 + dx + cols, 1:1 + rows] &
+                             open_cells[1:1 + cols, 1 + dy:1 + dy + rows])
+                neighbour = np.where(corner_ok, neighbour, np.inf)
+            better = neighbour < best
+            best = np.where(better, neighbour, best)
+            length = math.hypot(dx, dy)
+            dir_x = np.where(better, dx / length, dir_x)
+            dir_y = np.where(better, dy / length, dir_y)
+        self.dir_x = dir_x
+        self.dir_y = dir_y
+        self.valid = best < distance
+
+    def directions(self, xs, ys):
+        #unit direction for each position, and whether the field has one for that cell
+        gx = ((xs - self.left) // self.cell_size).astype(np.int64)
+        gy = ((ys - self.top) // self.cell_size).astype(np.int64)
+        cx = np.clip(gx, 0, self.cols - 1)
+        cy = np.clip(gy, 0, self.rows - 1)
+        #outside the area the field covers they fall back to heading straight for the player
+        valid = self.valid[cx, cy] & (gx == cx) & (gy == cy)
+        #next to a player the grid is too coarse, so head straight for them instead
+        for target_x, target_y in self.target or ():
+            near = (np.abs(cx - target_x) <= 1) & (np.abs(cy - target_y) <= 1)
+            valid &= ~near
+        return self.dir_x[cx, cy], self.dir_y[cx, cy], valid
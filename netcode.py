@@ -0,0 +1,260 @@
+import math, struct
+from collections import OrderedDict
+
+import numpy as np
+
+from game import Inputs
+
+#wire format for co-op over UDP. clients send their input every frame, the server sends
+#each client a snapshot every few ticks. positions go out as quarter pixels in 16 bits
+#and angles in 8, and the zombies in a snapshot are only the ones near that client's
+#player, written as changes against the last snapshot the client said it got.
+#so a packet stays the same size however big the horde is
+
+PROTOCOL = 1
+DEFAULT_PORT = 5555
+
+HELLO, WELCOME, INPUT, SNAPSHOT, BYE = range(1, 6)
+
+KIND = struct.Struct("<B")
+HELLO_PACKET = struct.Struct("<BH") #kind, protocol
+#kind, protocol, player id, world seed, view width, view height, ticks per second,
+#ticks between snapshots, ammo box, hp box
+WELCOME_PACKET = struct.Struct("<BHBQHHHBqqqq")
+#kind, input number, newest snapshot tick received, held keys as bits, aim, then running
+#counts of clicks, reloads, buys and next waves. counts wrap at 256 and the server
+#works out how many are new, so a lost packet doesn't lose a shot
+INPUT_PACKET = struct.Struct("<BIIBHBBBB")
+BYE_PACKET = struct.Struct("<B")
+#kind, tick, tick this is a delta against (0 for none), score, wave, game over,
+#world centre chunk, number of players
+SNAPSHOT_HEADER = struct.Struct("<BIIqIBiiB")
+#id, x, y, angle, health, max health, mag, reserve, reloading
+PLAYER_RECORD = struct.Struct("<BHHBIIHHB")
+#present, x, y, angle, health
+BOSS_RECORD = struct.Struct("<BHHBI")
+#zombies gone, zombies moved a little, zombies new or moved a lot, bullets
+COUNTS = struct.Struct("<HHHH")
+
+HELD = ("up", "down", "left", "right")
+PRESSES = ("fire", "reload", "buy", "next_wave")
+
+ZOMBIE_FULL = np.dtype([("id", "<u2"), ("x", "<u2"), ("y", "<u2"), ("angle", "u1")])
+ZOMBIE_MOVE = np.dtype([("id", "<u2"), ("dx", "i1"), ("dy", "i1"), ("angle", "u1")])
+BULLET = np.dtype([("x", "<u2"), ("y", "<u2")])
+
+POSITION_SCALE = 4
+ANGLE_STEPS = 256
+#how many snapshots each side remembers to delta against
+HISTORY = 64
+
+
+def quantize_position(value):
+    return np.clip(np.rint(np.asarray(value, dtype=float) * POSITION_SCALE), 0, 65535).astype(np.uint16)
+
+
+def position(value):
+    return np.asarray(value, dtype=float) / POSITION_SCALE
+
+
+def quantize_angle(value, steps=ANGLE_STEPS):
+    #aim goes out finer than how things are facing, steps=65536 for that
+    return np.rint(np.asarray(value, dtype=float) * steps / math.tau).astype(np.int64) % steps
+
+
+def angle(value, steps=ANGLE_STEPS):
+    return np.asarray(value, dtype=float) * math.tau / steps
+
+
+def kind(data):
+    return data[0] if data else 0
+
+
+#what a client keeps sending about its input, counting presses up instead of flagging them
+class InputSender:
+    def __init__(self):
+        self.sequence = 0
+        self.counts = dict.fromkeys(PRESSES, 0)
+
+    def pack(self, inputs, ack):
+        self.sequence += 1
+        flags = 0
+        for bit, name in enumerate(HELD):
+            if getattr(inputs, name):
+                flags |= 1 << bit
+        counts = self.counts
+        for name in PRESSES:
+            counts[name] = (counts[name] + int(getattr(inputs, name))) % 256
+        return INPUT_PACKET.pack(INPUT, self.sequence, ack, flags, int(quantize_angle(inputs.aim, 65536)),
+                                 *(counts[name] for name in PRESSES))
+
+
+#the server side of one client's input. packets that arrive late are dropped, presses
+#are the difference between the counts in the newest packet and the last one used
+class InputReceiver:
+    def __init__(self):
+        self.sequence = 0
+        self.ack = 0
+        self.counts = None
+        self.inputs = Inputs()
+
+    def unpack(self, data):
+        _, sequence, ack, flags, aim, *counts = INPUT_PACKET.unpack(data)
+        if sequence <= self.sequence:
+            return
+        self.sequence = sequence
+        self.ack = max(self.ack, ack)
+        latest = Inputs(aim=float(angle(aim, 65536)))
+        for bit, name in enumerate(HELD):
+            setattr(latest, name, bool(flags >> bit & 1))
+        if self.counts is None:
+            self.counts = counts
+        for name, count, last in zip(PRESSES, counts, self.counts):
+            pressed = (count - last) % 256
+            setattr(latest, name, pressed if name == "fire" else bool(pressed))
+        self.counts = counts
+        self.inputs.merge(latest)
+
+    def take(self):
+        #this tick's input, presses only count once
+        inputs, self.inputs = self.inputs, self.inputs.held()
+        return inputs
+
+
+#zombies near one point, closest first and at most limit of them, as sorted slot ids
+#with quantized positions. a handful of numpy ops over the live slots whatever the count
+def interest(swarm, x, y, radius, limit):
+    slots = swarm.alive_slots()
+    dist = np.hypot(swarm.x[slots] - x, swarm.y[slots] - y)
+    close = np.flatnonzero(dist <= radius)
+    if close.size > limit:
+        close = close[np.argpartition(dist[close], limit)[:limit]]
+    slots = np.sort(slots[close])
+    return (slots.astype(np.uint16), quantize_position(swarm.x[slots]),
+            quantize_position(swarm.y[slots]), quantize_angle(swarm.angle[slots]).astype(np.uint8))
+
+
+def visible_bullets(bullets, rect, limit):
+    xs, ys = bullets.positions()
+    inside = np.flatnonzero((xs >= rect.left) & (xs < rect.right) & (ys >= rect.top) & (ys < rect.bottom))
+    out = np.zeros(min(inside.size, limit), dtype=BULLET)
+    out["x"] = quantize_position(xs[inside[:limit]])
+    out["y"] = quantize_position(ys[inside[:limit]])
+    return out
+
+
+def encode_zombies(table, baseline):
+    #the zombies in table written against baseline: which are gone, which moved a little
+    #and which are new or jumped too far for a byte. unchanged ones aren't sent at all
+    ids, xs, ys, angles = table
+    if baseline is None or not baseline[0].size:
+        gone = np.zeros(0, dtype="<u2")
+        small = np.zeros(ids.size, dtype=bool)
+        full = np.ones(ids.size, dtype=bool)
+        dx = dy = np.zeros(ids.size, dtype=np.int64)
+    else:
+        base_ids, base_x, base_y, base_angle = baseline
+        where = np.minimum(np.searchsorted(base_ids, ids), base_ids.size - 1)
+        known = base_ids[where] == ids
+        dx = xs.astype(np.int64) - base_x[where]
+        dy = ys.astype(np.int64) - base_y[where]
+        same = known & (dx == 0) & (dy == 0) & (angles == base_angle[where])
+        small = known & ~same & (np.abs(dx) < 128) & (np.abs(dy) < 128)
+        full = ~(same | small)
+        gone = np.setdiff1d(base_ids, ids, assume_unique=True).astype("<u2")
+
+    moved = np.zeros(int(small.sum()), dtype=ZOMBIE_MOVE)
+    moved["id"], moved["dx"], moved["dy"], moved["angle"] = ids[small], dx[small], dy[small], angles[small]
+    new = np.zeros(int(full.sum()), dtype=ZOMBIE_FULL)
+    new["id"], new["x"], new["y"], new["angle"] = ids[full], xs[full], ys[full], angles[full]
+    return gone, moved, new
+
+
+def decode_zombies(baseline, gone, moved, new):
+    #the inverse of encode_zombies, giving back the whole table the server sent
+    table = dict(baseline)
+    for zombie_id in gone.tolist():
+        table.pop(zombie_id, None)
+    for zombie_id, dx, dy, zombie_angle in moved.tolist():
+        if zombie_id not in table:
+            raise ValueError(f"zombie {zombie_id} moved but isn't in the baseline")
+        x, y, _ = table[zombie_id]
+        table[zombie_id] = (x + dx, y + dy, zombie_angle)
+    for zombie_id, x, y, zombie_angle in new.tolist():
+        table[zombie_id] = (x, y, zombie_angle)
+    return table
+
+
+#snapshots sent to one client, by tick, so the next one can be a delta against
+#whichever the client last acknowledged
+class SnapshotHistory:
+    def __init__(self, size=HISTORY):
+        self.size = size
+        self.tables = OrderedDict()
+
+    def add(self, tick, table):
+        self.tables[tick] = table
+        while len(self.tables) > self.size:
+            self.tables.popitem(last=False)
+
+    def get(self, tick):
+        return self.tables.get(tick)
+
+    def clear(self):
+        self.tables.clear()
+
+
+def pack_player(player_id, player):
+    return PLAYER_RECORD.pack(player_id, int(quantize_position(player.world_x)),
+                              int(quantize_position(player.world_y)), int(quantize_angle(player.angle)),
+                              max(player.health, 0), player.max_health, min(player.bullets_in_mag, 65535),
+                              min(player.reserve_ammo, 65535), player.is_reloading)
+
+
+def pack_snapshot(tick, baseline_tick, game, player_ids, zombies, bullets):
+    #player_ids pairs every Player in the game with the id its client knows it by
+    gone, moved, new = zombies
+    boss = game.boss
+    out = [SNAPSHOT_HEADER.pack(SNAPSHOT, tick, baseline_tick, game.score, game.wave, game.game_over,
+                                game.world.centre[0], game.world.centre[1], len(player_ids))]
+    out.extend(pack_player(player_id, player) for player, player_id in player_ids)
+    if boss:
+        out.append(BOSS_RECORD.pack(True, int(quantize_position(boss.world_x)), int(quantize_position(boss.world_y)),
+                                    int(quantize_angle(boss.angle)), max(int(boss.health), 0)))
+    else:
+        out.append(BOSS_RECORD.pack(False, 0, 0, 0, 0))
+    out.append(COUNTS.pack(gone.size, moved.size, new.size, bullets.size))
+    out.extend((gone.tobytes(), moved.tobytes(), new.tobytes(), bullets.tobytes()))
+    return b"".join(out)
+
+
+#one received snapshot with the zombies still as a delta, the client resolves it
+#against its own history. a packet that is cut short, isn't a snapshot or doesn't add
+#up to its own counts raises ValueError, UDP gives no promise about what arrives
+class Snapshot:
+    def __init__(self, data):
+        if len(data) < SNAPSHOT_HEADER.size or kind(data) != SNAPSHOT:
+            raise ValueError("not a snapshot")
+        (_, self.tick, self.baseline, self.score, self.wave, self.game_over,
+         centre_x, centre_y, player_count) = SNAPSHOT_HEADER.unpack_from(data)
+        self.centre = (centre_x, centre_y)
+        offset = SNAPSHOT_HEADER.size
+        if len(data) < offset + player_count * PLAYER_RECORD.size + BOSS_RECORD.size + COUNTS.size:
+            raise ValueError("snapshot cut short")
+        self.players = []
+        for _ in range(player_count):
+            self.players.append(PLAYER_RECORD.unpack_from(data, offset))
+            offset += PLAYER_RECORD.size
+        self.boss = BOSS_RECORD.unpack_from(data, offset)
+        offset += BOSS_RECORD.size
+        counts = COUNTS.unpack_from(data, offset)
+        offset += COUNTS.size
+        dtypes = (np.dtype("<u2"), ZOMBIE_MOVE, ZOMBIE_FULL, BULLET)
+        if len(data) != offset + sum(count * dtype.itemsize for count, dtype in zip(counts, dtypes)):
+            raise ValueError("snapshot length doesn't match its counts")
+        arrays = []
+        for count, dtype in zip(counts, dtypes):
+            end = offset + count * dtype.itemsize
+            arrays.append(np.frombuffer(data[offset:end], dtype=dtype))
+            offset = end
+        self.gone, self.moved, self.new, self.bullets = arrays
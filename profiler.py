@@ -0,0 +1,142 @@
+import json
+from collections import deque
+from time import perf_counter
+
+
+#splits each frame into named phases, mark(name) charges the time since the
+#previous mark to that phase. kept tiny because it sits on the hot path.
+#finished frames go into a ring buffer so it can stay on all game long
+class PhaseTimer:
+    def __init__(self, capacity=None):
+        self.frames = deque(maxlen=capacity)
+        self.spans = []
+        self.current = {}
+        self.last = perf_counter()
+        self.frame_start = self.last
+
+    def begin_frame(self):
+        self.current = {}
+        self.spans = []
+        self.last = self.frame_start = perf_counter()
+
+    def mark(self, name):
+        now = perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + now - self.last
+        self.spans.append((name, self.last, now))
+        self.last = now
+
+    def end_frame(self):
+        now = perf_counter()
+        self.current["frame"] = now - self.frame_start
+        self.frames.append((self.frame_start, self.current, self.spans))
+        self.current = {}
+        self.spans = []
+        self.last = now
+
+    def phase_frames(self):
+        #just the per phase totals of each kept frame, oldest first
+        return [phases for _, phases, _ in self.frames]
+
+    def stats(self, window=120):
+        #rolling average and worst frame in ms for each phase over the last window frames
+        recent = list(self.frames)[-window:]
+        totals, worst = {}, {}
+        for _, phases, _ in recent:
+            for name, seconds in phases.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+                worst[name] = max(worst.get(name, 0.0), seconds)
+        count = len(recent) or 1
+        return {name: (totals[name] * 1000 / count, worst[name] * 1000) for name in totals}
+
+    def dump_trace(self, path):
+        #chrome://tracing / perfetto json, one complete event per phase
+        if not self.frames:
+            return
+        origin = self.frames[0][0]
+        events = []
+        for index, (frame_start, phases, spans) in enumerate(self.frames):
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": (frame_start - origin) * 1e6, "dur": phases["frame"] * 1e6,
+                           "args": {"frame": index}})
+            for name, start, end in spans:
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+#stand in used when nothing is measuring, so callers never need an if
+class NullTimer:
+    def begin_frame(self):
+        pass
+
+    def mark(self, name):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+#on screen table of phase timings plus a frame time graph, toggled in game.
+#the text is only re-rendered a few times a second so it barely shows up itself
+class ProfilerOverlay:
+    def __init__(self, timer, font, window=120, refresh_ms=250, budget_ms=1000 / 60):
+        self.timer = timer
+        self.font = font
+        self.window = window
+        self.refresh_ms = refresh_ms
+        self.budget_ms = budget_ms
+        self.visible = False
+        self.surface = None
+        self.last_refresh = -refresh_ms
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.surface = None
+
+    def build(self):
+        import pygame
+
+        stats = self.timer.stats(self.window)
+        frame_avg, frame_max = stats.pop("frame", (0.0, 0.0))
+        rows = sorted(stats.items(), key=lambda item: item[1][0], reverse=True)
+        line_h = self.font.get_linesize()
+        graph_h = 40
+        width = 260
+        height = line_h * (len(rows) + 2) + graph_h + 12
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 180))
+
+        fps = 1000 / frame_avg if frame_avg else 0
+        header = f"frame {frame_avg:6.2f} avg {frame_max:6.2f} max  {fps:4.0f} fps"
+        surface.blit(self.font.render(header, True, (255, 255, 255)), (6, 4))
+        surface.blit(self.font.render("phase           avg ms  max ms", True, (180, 180, 180)), (6, 4 + line_h))
+        for row, (name, (avg, worst)) in enumerate(rows):
+            #a phase is spiking when its worst frame is way over its own average
+            spiking = worst > 2 * avg and worst > 1.0
+            colour = (255, 80, 80) if spiking else (255, 255, 255)
+            text = f"{name[:14]:<14} {avg:7.2f} {worst:7.2f}"
+            surface.blit(self.font.render(text, True, colour), (6, 4 + line_h * (row + 2)))
+
+        #one bar per frame, red when it went over the frame budget
+        top = height - graph_h - 4
+        frames = self.timer.phase_frames()[-(width - 12):]
+        for x, phases in enumerate(frames):
+            ms = phases.get("frame", 0.0) * 1000
+            bar = min(graph_h, int(ms / (2 * self.budget_ms) * graph_h))
+            colour = (255, 80, 80) if ms > self.budget_ms else (80, 220, 80)
+            pygame.draw.line(surface, colour, (6 + x, top + graph_h), (6 + x, top + graph_h - bar))
+        budget_y = top + graph_h // 2
+        pygame.draw.line(surface, (200, 200, 200), (6, budget_y), (width - 6, budget_y))
+        return surface
+
+    def draw(self, screen, now_ms):
+        if not self.visible:
+            return
+        if self.surface is None or now_ms - self.last_refresh >= self.refresh_ms:
+            self.surface = self.build()
+            self.last_refresh = now_ms
+        screen.blit(self.surface, (10, screen.get_height() - self.surface.get_height() - 10))
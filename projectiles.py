@@ -0,0 +1,170 @@
+import math
+
+import numpy as np
+
+
+#earliest time along each segment (0 to 1) where it enters the box, nan when it misses
+def segment_box_entry(x0, y0, x1, y1, left, top, right, bottom):
+    dx = x1 - x0
+    dy = y1 - y0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx1 = (left - x0) / dx
+        tx2 = (right - x0) / dx
+        ty1 = (top - y0) / dy
+        ty2 = (bottom - y0) / dy
+    #a segment that doesn't move on an axis is either always or never inside that slab
+    inside_x = (left <= x0) & (x0 <= right)
+    inside_y = (top <= y0) & (y0 <= bottom)
+    still_x = dx == 0
+    still_y = dy == 0
+    enter_x = np.where(still_x, np.where(inside_x, -np.inf, np.inf), np.minimum(tx1, tx2))
+    leave_x = np.where(still_x, np.where(inside_x, np.inf, -np.inf), np.maximum(tx1, tx2))
+    enter_y = np.where(still_y, np.where(inside_y, -np.inf, np.inf), np.minimum(ty1, ty2))
+    leave_y = np.where(still_y, np.where(inside_y, np.inf, -np.inf), np.maximum(ty1, ty2))
+    enter = np.maximum(np.maximum(enter_x, enter_y), 0.0)
+    leave = np.minimum(np.minimum(leave_x, leave_y), 1.0)
+    return np.where(enter <= leave, enter, np.nan)
+
+
+#fixed size pool of bullets kept in preallocated arrays, nothing is allocated per shot
+#hits are swept along the path travelled this frame so fast bullets can't skip a zombie.
+#each shot books its own expiry with the timers, a slot that has been reused since
+#has a newer generation so the old expiry leaves it alone
+class BulletPool:
+    def __init__(self, capacity=1024, speed=40, size=5, lifetime=5000, timers=None):
+        self.speed = speed
+        self.size = size
+        self.lifetime = lifetime
+        self.timers = timers
+        self.serial = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.spawn_time = np.zeros(capacity)
+        self.generation = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def spawn(self, x, y, angle, now):
+        if self.free:
+            index = self.free.pop()
+        else:
+            #pool is full, recycle the oldest bullet rather than growing
+            index = int(np.argmin(self.spawn_time))
+        self.x[index] = self.prev_x[index] = x
+        self.y[index] = self.prev_y[index] = y
+        #the angle never changes so the trig happens once here instead of every frame
+        self.vx[index] = self.speed * math.cos(angle)
+        self.vy[index] = self.speed * math.sin(angle)
+        self.spawn_time[index] = now
+        self.alive[index] = True
+        self.serial += 1
+        self.generation[index] = self.serial
+        if self.timers is not None:
+            self.timers.at(now + self.lifetime, self.expire, index, self.serial)
+        return index
+
+    def expire(self, index, generation):
+        if self.generation[index] == generation:
+            self.kill(index)
+
+    def schedule_expiry(self):
+        #books the expiry of every live bullet again, oldest shot first like they were fired
+        idx = np.flatnonzero(self.alive)
+        idx = idx[np.argsort(self.generation[idx], kind="stable")]
+        for index, spawn_time, generation in zip(idx.tolist(), self.spawn_time[idx].tolist(),
+                                                 self.generation[idx].tolist()):
+            self.timers.at(spawn_time + self.lifetime, self.expire, index, generation)
+        self.serial = max(self.serial, int(self.generation.max(initial=0)))
+
+    def kill(self, indices):
+        for index in np.atleast_1d(indices).tolist():
+            if self.alive[index]:
+                self.alive[index] = False
+                self.free.append(index)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free = list(range(len(self.alive) - 1, -1, -1))
+
+    def update(self, view_rect, scale=1.0):
+        #moves every live bullet, then drops the ones that left the view
+        idx = np.flatnonzero(self.alive)
+        if not idx.size:
+            return
+        self.prev_x[idx] = self.x[idx]
+        self.prev_y[idx] = self.y[idx]
+        self.x[idx] += self.vx[idx] * scale
+        self.y[idx] += self.vy[idx] * scale
+        x, y = self.x[idx], self.y[idx]
+        size = self.size
+        gone = ((x < view_rect.left - size) | (x > view_rect.right + size) |
+                (y < view_rect.top - size) | (y > view_rect.bottom + size))
+        self.kill(idx[gone])
+
+    def sweep(self, idx, left, top, right, bottom):
+        #entry time of each bullet's path into a box grown by the bullet radius
+        size = self.size
+        return segment_box_entry(self.prev_x[idx], self.prev_y[idx], self.x[idx], self.y[idx],
+                                 left - size, top - size, right + size, bottom + size)
+
+    def hit_swarm(self, swarm, grid):
+        #kills the first zombie along each bullet's path, returns how many died
+        idx = np.flatnonzero(self.alive)
+        if not idx.size:
+            return 0
+        size = self.size
+        px, py, x, y = self.prev_x[idx], self.prev_y[idx], self.x[idx], self.y[idx]
+        bullet, slot = grid.query_many(np.minimum(px, x) - size, np.minimum(py, y) - size,
+                                       np.maximum(px, x) + size, np.maximum(py, y) + size)
+        if not bullet.size:
+            return 0
+        live = swarm.alive[slot]
+        bullet, slot = bullet[live], slot[live]
+        t = self.sweep(idx[bullet], *swarm.rect_edges(slot))
+        hit = ~np.isnan(t)
+        bullet, slot, t = bullet[hit], slot[hit], t[hit]
+        #closest hits first, each bullet and each zombie can only be used once
+        order = np.lexsort((t, bullet))
+        kills = 0
+        used = set()
+        for b, s in zip(bullet[order].tolist(), slot[order].tolist()):
+            if b in used or not swarm.alive[s]:
+                continue
+            used.add(b)
+            swarm.kill(s)
+            kills += 1
+        self.kill(idx[list(used)])
+        return kills
+
+    def hit_rect(self, rect, limit=None):
+        #bullets whose path crosses rect are used up, oldest first, up to limit of them
+        idx = np.flatnonzero(self.alive)
+        if not idx.size:
+            return 0
+        t = self.sweep(idx, rect.left, rect.top, rect.right, rect.bottom)
+        hits = idx[~np.isnan(t)]
+        if limit is not None:
+            hits = hits[np.argsort(self.spawn_time[hits], kind="stable")][:limit]
+        self.kill(hits)
+        return len(hits)
+
+    def view(self):
+        #bullet positions for one drawn frame, spawning and expiring bullets after
+        #this doesn't touch them
+        view = BulletPool(0, self.speed, self.size, self.lifetime)
+        for name in ("x", "y", "prev_x", "prev_y", "alive"):
+            setattr(view, name, getattr(self, name).copy())
+        return view
+
+    def positions(self, alpha=1.0):
+        #alpha blends from where each bullet started the tick, for drawing between ticks
+        idx = np.flatnonzero(self.alive)
+        prev_x, prev_y = self.prev_x[idx], self.prev_y[idx]
+        return prev_x + (self.x[idx] - prev_x) * alpha, prev_y + (self.y[idx] - prev_y) * alpha
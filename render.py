@@ -0,0 +1,185 @@
+import numpy as np
+import pygame
+
+from game import WORLD_WIDTH, WORLD_HEIGHT
+from assets import AssetManager
+from sprites import RotationCache
+from static_layer import StaticLayer
+from lighting import Flashlight
+from minimap import Minimap
+from hud import Hud
+from profiler import NULL_TIMER
+from render_queue import RenderQueue, GROUND, ACTORS
+
+#random colours if needed
+WHITE = (255, 255, 255)
+GREEN = (0, 200, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+ORANGE = (255, 165, 0)
+
+
+#position of a player or boss alpha of the way from the last tick to this one
+def lerp(entity, alpha):
+    return (entity.prev_x + (entity.world_x - entity.prev_x) * alpha,
+            entity.prev_y + (entity.world_y - entity.prev_y) * alpha)
+
+
+#draws a Game, or a RenderState captured from one, onto the screen.
+#owns every image so the simulation never touches them
+#needs pygame.display.set_mode to have been called for convert() to work
+class Renderer:
+    def __init__(self, screen, font, shadows=False, assets=None):
+        self.screen = screen
+        self.font = font
+        self.profiler = NULL_TIMER
+        self.width = screen.get_width()
+        self.height = screen.get_height()
+
+        #every image comes from the asset manager, scaled once and shared
+        self.assets = assets if assets is not None else AssetManager()
+        self.grass_image = self.assets.image("grass.png", alpha=False)
+        self.tree_image = self.assets.image("finaltree.png", (120, 150))
+        self.rock_image = self.assets.image("finalrock.png", (100, 70))
+        self.ammo_box_image = self.assets.image("ammo_box.png", (60, 60))
+        #health machine to increase health
+        self.hp_box_image = self.assets.image("hp_box.png", (110, 130))
+        self.player_sprite = self.assets.image("survivor-move_rifle_0.png", (60, 60))
+        self.enemy_sprite = self.assets.image("skeleton-attack_0.png", (60, 60))
+        self.boss_sprite = self.assets.image("boss.png", (100, 100))
+
+        #rotated frames in 2 degree steps, the zombie and player ones are made up front
+        self.rotation_cache = RotationCache(step_degrees=2)
+        self.rotation_cache.warm(self.enemy_sprite)
+        self.rotation_cache.warm(self.player_sprite)
+
+        #bullets all look the same so they share one pre-drawn sprite
+        self.bullet_sprite = pygame.Surface((11, 11), pygame.SRCALPHA)
+        pygame.draw.circle(self.bullet_sprite, WHITE, (5, 5), 5)
+
+        self.images = {"tree": self.tree_image, "rock": self.rock_image}
+        self.static_layer = None
+        self.minimap = None
+        self.world_source = None
+        self.queue = RenderQueue(self.width, self.height)
+        self.tree_x = self.tree_y = np.zeros(0)
+        self.flashlight = Flashlight(self.width, self.height, shadows=shadows)
+        self.hud = Hud(font)
+
+    def draw_boss_health(self, boss, screen_x, screen_y):
+        health_bar_width = 60
+        pygame.draw.rect(self.screen, RED, (screen_x - 30, screen_y - 60, health_bar_width, 8))
+        pygame.draw.rect(self.screen, GREEN, (screen_x - 30, screen_y - 60, int(health_bar_width * boss.health / 300), 8))
+
+    def queue_enemies(self, swarm, alpha=1.0):
+        #only the near band is ever on screen, and of that only what the camera can see
+        slots = swarm.near_slots()
+        xs, ys = swarm.positions(slots, alpha)
+        half = self.enemy_sprite.get_width()
+        visible = self.queue.visible(xs, ys, half, half)
+        frames = self.rotation_cache.get_many(self.enemy_sprite, swarm.angle[slots[visible]])
+        self.queue.add_many(frames, xs[visible].tolist(), ys[visible].tolist(), ACTORS)
+
+    def queue_trees(self):
+        #every tree shares one image, so culling them is a single mask
+        width, height = self.tree_image.get_size()
+        visible = self.queue.visible(self.tree_x, self.tree_y, width / 2, height / 2)
+        count = int(visible.sum())
+        self.queue.add_many([self.tree_image] * count, self.tree_x[visible].tolist(),
+                            self.tree_y[visible].tolist(), ACTORS)
+
+    def draw_bullets(self, bullets, camera_x, camera_y, alpha=1.0):
+        xs, ys = bullets.positions(alpha)
+        if not len(xs):
+            return
+        sx = (xs - camera_x).astype(int) - 5
+        sy = (ys - camera_y).astype(int) - 5
+        sprite = self.bullet_sprite
+        self.screen.blits([(sprite, pos) for pos in zip(sx.tolist(), sy.tolist())], doreturn=False)
+
+    def set_world(self, game):
+        #caches that depend on where the obstacles are follow the loaded part of the world
+        rocks = [obj for obj in game.environment_objects if not obj.is_tree]
+        if self.static_layer is None:
+            self.static_layer = StaticLayer(self.grass_image, self.images, WORLD_WIDTH, WORLD_HEIGHT)
+        self.static_layer.set_objects(rocks)
+        trees = [obj for obj in game.environment_objects if obj.is_tree]
+        self.tree_x = np.array([obj.world_x for obj in trees], dtype=float)
+        self.tree_y = np.array([obj.world_y for obj in trees], dtype=float)
+        self.minimap = Minimap(game.area, game.environment_objects)
+        self.world_source = game.environment_objects
+
+    def draw(self, game, now_ms=0, alpha=1.0):
+        #alpha is how far the real time is between the last tick and the next one,
+        #moving things are drawn that far between where they were and where they are
+        screen = self.screen
+        player = game.player
+        SCREEN_WIDTH, SCREEN_HEIGHT = self.width, self.height
+        player_x, player_y = lerp(player, alpha)
+        camera_x = int(player_x) - SCREEN_WIDTH // 2
+        camera_y = int(player_y) - SCREEN_HEIGHT // 2
+        profiler = self.profiler
+
+        # Ground, rocks and world border come pre-baked in chunks
+        if self.world_source is not game.environment_objects:
+            self.set_world(game)
+        self.static_layer.draw(screen, camera_x, camera_y)
+        profiler.mark("ground")
+
+        # Trees, boxes and everything that moves go through one queue, culled to the
+        # camera and sorted so whatever is lower on the screen is drawn in front
+        queue = self.queue
+        queue.begin(camera_x, camera_y)
+        ammo_box, hp_box = game.ammo_box, game.hp_box
+        queue.add(self.ammo_box_image, ammo_box.world_x, ammo_box.world_y, GROUND)
+        queue.add(self.hp_box_image, hp_box.world_x, hp_box.world_y, GROUND)
+        self.queue_trees()
+        queue.add(self.rotation_cache.get(self.player_sprite, player.angle), player_x, player_y, ACTORS)
+        for other in game.players:
+            if other is not player:
+                other_x, other_y = lerp(other, alpha)
+                queue.add(self.rotation_cache.get(self.player_sprite, other.angle), other_x, other_y, ACTORS)
+        self.queue_enemies(game.swarm, alpha)
+        boss = game.boss
+        if boss:
+            boss_x, boss_y = lerp(boss, alpha)
+            queue.add(self.rotation_cache.get(self.boss_sprite, boss.angle), boss_x, boss_y, ACTORS)
+        profiler.mark("cull")
+        queue.flush(screen)
+        profiler.mark("sprites")
+
+        # Ammo box location indicator
+        pygame.draw.circle(screen, (255, 105, 180), (ammo_box.world_x - camera_x, ammo_box.world_y - camera_y), 1)
+        if boss:
+            self.draw_boss_health(boss, boss_x - camera_x, boss_y - camera_y)
+
+        self.draw_bullets(game.bullets, camera_x, camera_y, alpha)
+        profiler.mark("bullets_draw")
+
+        # Out-of-screen enemy indicators, zombies pinned to the same spot share one circle
+        swarm = game.swarm
+        slots = swarm.alive_slots()
+        xs, ys = swarm.positions(slots, alpha)
+        sx, sy = xs - camera_x, ys - camera_y
+        outside = (sx < 0) | (sx > SCREEN_WIDTH) | (sy < 0) | (sy > SCREEN_HEIGHT)
+        ix = np.clip(sx[outside], 10, SCREEN_WIDTH - 10).astype(int)
+        iy = np.clip(sy[outside], 10, SCREEN_HEIGHT - 10).astype(int)
+        for point in set(zip(ix.tolist(), iy.tolist())):
+            pygame.draw.circle(screen, RED, point, 5)
+        profiler.mark("indicators")
+
+        # Flashlight
+        self.flashlight.draw(screen, player.angle, int(player_x), int(player_y), game.obstacle_grid)
+        profiler.mark("lighting")
+
+        self.hud.draw(screen, game, camera_x, camera_y, now_ms)
+        profiler.mark("hud")
+
+        # Minimap
+        self.minimap.draw(screen, game, now_ms)
+        profiler.mark("minimap")
+
+    def draw_game_over(self):
+        self.screen.fill((0, 0, 0))
+        game_over = self.hud.text.render("Game Over!", WHITE)
+        self.screen.blit(game_over, (self.width // 2 - game_over.get_width() // 2, self.height // 2))
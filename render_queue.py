@@ -0,0 +1,61 @@
+from operator import itemgetter
+
+#layers are drawn bottom up, inside a layer lower y goes first so things further
+#down the screen stand in front of what is behind them
+GROUND = 0
+ACTORS = 1
+
+_sort_key = itemgetter(0, 1)
+
+
+#collects every world sprite for a frame, drops the ones outside the camera and hands
+#the rest to the screen in one blits call once they are sorted by layer and depth.
+#positions go in as world space centres, the queue does the camera offset
+class RenderQueue:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.camera_x = 0
+        self.camera_y = 0
+        self.items = []
+
+    def begin(self, camera_x, camera_y):
+        self.camera_x = camera_x
+        self.camera_y = camera_y
+        self.items = []
+
+    def visible(self, xs, ys, half_width, half_height):
+        #mask of the centres whose sprite overlaps the view, for whole arrays at once
+        sx = xs - self.camera_x
+        sy = ys - self.camera_y
+        return ((sx > -half_width) & (sx < self.width + half_width) &
+                (sy > -half_height) & (sy < self.height + half_height))
+
+    def add(self, image, world_x, world_y, layer=ACTORS, depth=None):
+        width, height = image.get_size()
+        x = world_x - self.camera_x - width // 2
+        y = world_y - self.camera_y - height // 2
+        if x >= self.width or y >= self.height or x + width <= 0 or y + height <= 0:
+            return False
+        self.items.append((layer, world_y if depth is None else depth, image, (x, y)))
+        return True
+
+    def add_many(self, images, xs, ys, layer=ACTORS):
+        #images, xs and ys already culled with visible(), ys doubles as the depth
+        camera_x, camera_y = self.camera_x, self.camera_y
+        self.items.extend((layer, y, image, (x - camera_x - image.get_width() // 2,
+                                             y - camera_y - image.get_height() // 2))
+                          for image, x, y in zip(images, xs, ys))
+
+    def flush(self, surface):
+        items = self.items
+        items.sort(key=_sort_key)
+        sequence = [(image, position) for _, _, image, position in items]
+        #pygame-ce has fblits which skips building the list of dirty rects
+        if hasattr(surface, "fblits"):
+            surface.fblits(sequence)
+        else:
+            surface.blits(sequence, doreturn=False)
+        self.items = []
+        return len(sequence)
+
@@ -0,0 +1,128 @@
+import argparse, json, os, struct, sys, time
+
+#a replay only steps the game and never draws or plays anything, so it runs fine on a
+#machine with no display or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from game import Game, Inputs
+from profiler import PhaseTimer
+import snapshot
+
+#session logs: a header with the seed, view size, tick rate and an optional snapshot to
+#start from, then one fixed size record per tick with the input that tick. the game only
+#changes through step(), so feeding the same records to a game with the same seed plays it out again.
+#   python replay.py last_session.zrec
+#   python replay.py last_session.zrec --out replay.json
+
+MAGIC = b"ZREC"
+VERSION = 3
+HEADER = struct.Struct("<4sHQHHHI") #magic, version, seed, view width, view height, ticks per second, snapshot size
+TICK = struct.Struct("<BBd") #held keys as bits, clicks, aim
+FLAGS = ("up", "down", "left", "right", "reload", "buy", "next_wave")
+
+
+#writes a session log as the game runs. every tick is 1 / tick_rate seconds long, worked
+#out the same way here and in the replay so it gets exactly the same float back
+class Recorder:
+    def __init__(self, path, seed, view_width, view_height, tick_rate, start=b""):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, view_width, view_height, tick_rate, len(start)))
+        self.file.write(start)
+
+    def record(self, inputs):
+        flags = 0
+        for bit, name in enumerate(FLAGS):
+            if getattr(inputs, name):
+                flags |= 1 << bit
+        self.file.write(TICK.pack(flags, min(inputs.fire, 255), inputs.aim))
+
+    def close(self):
+        self.file.close()
+
+
+#seed, view size, starting snapshot and a list of (inputs, dt) from a session log
+def read_log(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, view_width, view_height, tick_rate, start_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a session log")
+    if version != VERSION:
+        raise ValueError(f"{path} is version {version}, this reads version {VERSION}")
+    body = HEADER.size + start_size
+    start = data[HEADER.size:body]
+    ticks = []
+    #a log cut short by a crash just loses its last partial record
+    end = body + (len(data) - body) // TICK.size * TICK.size
+    dt = 1 / tick_rate
+    for flags, fire, aim in TICK.iter_unpack(data[body:end]):
+        inputs = Inputs(aim=aim, fire=fire)
+        for bit, name in enumerate(FLAGS):
+            setattr(inputs, name, bool(flags >> bit & 1))
+        ticks.append((inputs, dt))
+    return seed, view_width, view_height, start, ticks
+
+
+#steps a fresh game through every recorded tick as fast as it will go
+def replay(path, timer=None, renderer=None):
+    seed, view_width, view_height, start, ticks = read_log(path)
+    game = Game(seed=seed, view_width=view_width, view_height=view_height)
+    if start:
+        snapshot.load(game, start)
+    if timer:
+        game.profiler = timer
+        if renderer:
+            renderer.profiler = timer
+    for inputs, dt in ticks:
+        if timer:
+            timer.begin_frame()
+        game.step(inputs, dt)
+        if renderer:
+            renderer.draw(game, game.time)
+        if timer:
+            timer.end_frame()
+        if game.game_over:
+            break
+    return game
+
+
+def main():
+    from benchmark import summarise
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless")
+    parser.add_argument("log")
+    parser.add_argument("--render", action="store_true", help="also draw every frame to an offscreen window")
+    parser.add_argument("--out", help="write per phase timings as json to this file")
+    args = parser.parse_args()
+    log = os.path.abspath(args.log)
+
+    renderer = None
+    if args.render:
+        import pygame
+        from render import Renderer
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        pygame.init()
+        _, view_width, view_height, _, _ = read_log(log)
+        screen = pygame.display.set_mode((view_width, view_height))
+        renderer = Renderer(screen, pygame.font.SysFont('comicsansms', 30))
+
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    game = replay(log, timer, renderer)
+    elapsed = time.perf_counter() - start
+    frames = timer.phase_frames()
+    print(f"{len(frames)} ticks in {elapsed:.2f} s, {game.time / 1000:.1f} s of game time, "
+          f"wave {game.wave}, score {game.score}, health {game.player.health}"
+          f"{', game over' if game.game_over else ''}", file=sys.stderr)
+    if frames:
+        results = {"log": log, "ticks": len(frames), "phases": summarise(frames)}
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import heapq
+
+
+#a callback waiting in a Scheduler. cancelling only flags it, the heap drops it when it comes up
+class Timer:
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+#one-shot callbacks keyed on the game clock, kept in a heap so a tick only
+#looks at the timers that are actually due. the clock is whatever run() is given, for the
+#game that is Game.time, so timers stop while the game isn't stepping and fire on the
+#same tick every time a session is replayed. timers due together fire in the order they were added
+class Scheduler:
+    def __init__(self):
+        self.heap = []
+        self.count = 0 #tie breaker, also keeps the heap from ever comparing two timers
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, timer):
+        heapq.heappush(self.heap, (timer.due, self.count, timer))
+        self.count += 1
+        return timer
+
+    def at(self, due, callback, *args):
+        return self.push(Timer(due, callback, args))
+
+    def clear(self):
+        self.heap = []
+
+    def run(self, now):
+        #fires everything due by now
+        heap = self.heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            timer.callback(*timer.args)
+            fired += 1
+        return fired
@@ -0,0 +1,225 @@
+import argparse, os, random, socket, sys, time
+
+#the server never opens a window, pygame only does the rect maths
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from game import Game
+import netcode
+from netcode import (HELLO, INPUT, BYE, PROTOCOL, DEFAULT_PORT, HELLO_PACKET, WELCOME_PACKET, WELCOME,
+                     InputReceiver, SnapshotHistory, encode_zombies, interest, visible_bullets, pack_snapshot)
+
+#authoritative co-op server. it owns the only Game, steps it at a fixed rate with
+#everyone's latest input and sends each client its own snapshot every few ticks.
+#   python server.py
+#   python server.py --port 5555 --horde 2000
+#then on each machine
+#   python client.py --host <server address>
+
+
+#one connected player as the server sees them
+class Connection:
+    def __init__(self, player_id, address, player, now):
+        self.player_id = player_id
+        self.address = address
+        self.player = player
+        self.last_heard = now
+        self.input = InputReceiver()
+        self.history = SnapshotHistory()
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+
+
+class Server:
+    def __init__(self, port=DEFAULT_PORT, seed=None, tick_rate=60, send_every=2, max_players=4,
+                 interest_radius=1000, max_zombies=128, max_bullets=64, timeout=5.0, horde=0, host=""):
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.tick_rate = tick_rate
+        self.send_every = send_every
+        self.max_players = max_players
+        #zombies further than this from a client's player, or past the closest max_zombies,
+        #aren't sent to that client at all
+        self.interest_radius = interest_radius
+        self.max_zombies = max_zombies
+        self.max_bullets = max_bullets
+        self.timeout = timeout
+        self.horde = horde #zombies to start with instead of the first wave, for load testing
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.port = self.socket.getsockname()[1]
+        self.connections = {}
+        self.next_id = 1
+        self.game = None
+        self.tick = 0
+        self.restart_at = None
+        self.running = False
+
+    def new_game(self):
+        game = Game(seed=self.seed)
+        if self.horde:
+            game.enemies = game.spawn_enemies(self.horde)
+        return game
+
+    def join(self, address, now):
+        if len(self.connections) >= self.max_players:
+            return None
+        if self.game is None:
+            self.game = self.new_game()
+            player = self.game.player
+        else:
+            player = self.game.add_player()
+        connection = Connection(self.next_id, address, player, now)
+        self.next_id = self.next_id % 255 + 1
+        self.connections[address] = connection
+        print(f"player {connection.player_id} joined from {address[0]}:{address[1]}", file=sys.stderr)
+        return connection
+
+    def leave(self, connection):
+        del self.connections[connection.address]
+        print(f"player {connection.player_id} left", file=sys.stderr)
+        if not self.connections:
+            #nobody left to play it
+            self.game = None
+        else:
+            self.game.remove_player(connection.player)
+
+    def welcome(self, connection):
+        game = self.game
+        packet = WELCOME_PACKET.pack(WELCOME, PROTOCOL, connection.player_id, self.seed, game.view_width,
+                                     game.view_height, self.tick_rate, self.send_every,
+                                     game.ammo_box.world_x, game.ammo_box.world_y,
+                                     game.hp_box.world_x, game.hp_box.world_y)
+        self.socket.sendto(packet, connection.address)
+
+    def receive(self, now):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except BlockingIOError:
+                return
+            except ConnectionResetError:
+                #windows reports an earlier send to a closed port here, nothing to do with this read
+                continue
+            packet_kind = netcode.kind(data)
+            connection = self.connections.get(address)
+            if packet_kind == HELLO and len(data) == HELLO_PACKET.size:
+                if HELLO_PACKET.unpack(data)[1] != PROTOCOL:
+                    continue
+                #a repeated hello means the welcome got lost, send it again
+                connection = connection or self.join(address, now)
+                if connection:
+                    connection.last_heard = now
+                    self.welcome(connection)
+            elif connection is None:
+                continue
+            elif packet_kind == INPUT and len(data) == netcode.INPUT_PACKET.size:
+                connection.last_heard = now
+                connection.input.unpack(data)
+            elif packet_kind == BYE:
+                self.leave(connection)
+
+    def drop_silent(self, now):
+        for connection in list(self.connections.values()):
+            if now - connection.last_heard > self.timeout:
+                self.leave(connection)
+
+    def step(self):
+        game = self.game
+        players = {connection.player: connection for connection in self.connections.values()}
+        game.step([players[player].input.take() for player in game.players], 1 / self.tick_rate)
+        if game.game_over and self.restart_at is None:
+            self.restart_at = self.tick + 5 * self.tick_rate
+        elif self.restart_at is not None and self.tick >= self.restart_at:
+            self.restart()
+
+    def restart(self):
+        #a fresh game for everyone still connected, they keep their ids
+        self.restart_at = None
+        self.game = game = self.new_game()
+        for index, connection in enumerate(self.connections.values()):
+            connection.player = game.player if index == 0 else game.add_player()
+            connection.history.clear()
+            self.welcome(connection)
+
+    def send_snapshots(self):
+        game = self.game
+        player_ids = [(connection.player, connection.player_id) for connection in self.connections.values()]
+        for connection in self.connections.values():
+            player = connection.player
+            table = interest(game.swarm, player.world_x, player.world_y, self.interest_radius, self.max_zombies)
+            ack = connection.input.ack
+            baseline = connection.history.get(ack)
+            zombies = encode_zombies(table, baseline)
+            bullets = visible_bullets(game.bullets, game.view_rect(player), self.max_bullets)
+            packet = pack_snapshot(self.tick, ack if baseline is not None else 0, game, player_ids,
+                                   zombies, bullets)
+            connection.history.add(self.tick, table)
+            self.socket.sendto(packet, connection.address)
+            connection.bytes_sent += len(packet)
+            connection.snapshots_sent += 1
+
+    def run(self, ticks=None, stats=False):
+        #fixed rate loop, a late tick is caught up but never more than a few at once
+        tick_length = 1 / self.tick_rate
+        next_tick = time.perf_counter()
+        last_report = next_tick
+        step_time = 0.0
+        self.running = True
+        print(f"serving on port {self.port}, seed {self.seed}", file=sys.stderr)
+        while self.running and (ticks is None or self.tick < ticks):
+            now = time.perf_counter()
+            self.receive(now)
+            self.drop_silent(now)
+            if now < next_tick:
+                time.sleep(min(next_tick - now, 0.002))
+                continue
+            caught_up = 0
+            while now >= next_tick and caught_up < 5:
+                self.tick += 1
+                if self.game is not None:
+                    start = time.perf_counter()
+                    self.step()
+                    if self.tick % self.send_every == 0:
+                        self.send_snapshots()
+                    step_time += time.perf_counter() - start
+                next_tick += tick_length
+                caught_up += 1
+            next_tick = max(next_tick, now - tick_length)
+            if stats and self.connections and now - last_report >= 1.0:
+                self.report(now - last_report, step_time)
+                last_report, step_time = now, 0.0
+
+    def report(self, elapsed, step_time):
+        game = self.game
+        zombies = len(game.swarm.alive_slots()) if game else 0
+        rates = ", ".join(f"player {c.player_id} {c.bytes_sent / elapsed / 1024:.1f} KB/s"
+                          for c in self.connections.values())
+        print(f"tick {self.tick}, {zombies} zombies, server busy {step_time / elapsed:.0%}"
+              f"{', ' + rates if rates else ''}", file=sys.stderr)
+        for connection in self.connections.values():
+            connection.bytes_sent = 0
+
+    def close(self):
+        self.socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a co-op server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--horde", type=int, default=0, help="start with this many zombies instead of the first wave, for load testing")
+    parser.add_argument("--ticks", type=int, help="stop after this many ticks")
+    parser.add_argument("--stats", action="store_true", help="print bandwidth and load every second")
+    args = parser.parse_args()
+    server = Server(port=args.port, seed=args.seed, horde=args.horde)
+    try:
+        server.run(args.ticks, args.stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import copy
+import threading
+from time import perf_counter, sleep
+
+from game import Inputs
+
+
+#everything the renderer reads from a Game, copied at the end of a tick. nothing in it
+#is changed afterwards, so the main thread can draw it while the next tick runs.
+#obstacle lists and grids are shared rather than copied, the game only ever replaces them
+class RenderState:
+    def __init__(self, game, time=0.0):
+        self.time = time #when this tick was due, on the perf_counter clock
+        self.players = [copy.copy(player) for player in game.players]
+        self.player = self.players[game.players.index(game.player)]
+        self.boss = copy.copy(game.boss) if game.boss else None
+        self.swarm = game.swarm.view()
+        self.bullets = game.bullets.view()
+        self.ammo_box = copy.copy(game.ammo_box)
+        self.hp_box = copy.copy(game.hp_box)
+        self.environment_objects = game.environment_objects
+        self.area = game.area
+        self.obstacle_grid = game.obstacle_grid
+        self.score = game.score
+        self.wave = game.wave
+        self.game_over = game.game_over
+        self.ammo_box_near = game.near_ammo_box()
+        self.hp_box_near = game.near_hp_box()
+
+    def near_ammo_box(self):
+        return self.ammo_box_near
+
+    def near_hp_box(self):
+        return self.hp_box_near
+
+
+#steps a Game at a fixed rate on its own thread. the main thread hands it input, reads
+#back the latest RenderState and the sounds played since it last asked. states are
+#double buffered: a tick builds a new one and then swaps the published reference,
+#so a reader always gets a whole tick and never waits on the simulation.
+#the simulation is python so it still shares the GIL, but numpy and pygame release it
+#for their heavy work and that part overlaps with drawing
+class SimulationThread:
+    def __init__(self, game, tick, max_ticks=5, on_tick=None):
+        self.game = game
+        self.tick = tick
+        self.max_ticks = max_ticks
+        self.on_tick = on_tick #called with each tick's input before it runs, for recording
+        self.lock = threading.Lock()
+        self.inputs = Inputs()
+        self.events = []
+        self.calls = []
+        self.running = False
+        self.thread = None
+        self.state = RenderState(game, perf_counter())
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def add_inputs(self, inputs):
+        with self.lock:
+            self.inputs.merge(inputs)
+
+    def call(self, function):
+        #runs function(game) on the simulation thread between two ticks
+        with self.lock:
+            self.calls.append(function)
+
+    def take_events(self):
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+    def latest(self):
+        return self.state
+
+    def run(self):
+        game = self.game
+        sim_time = perf_counter()
+        while self.running:
+            now = perf_counter()
+            if now - sim_time < self.tick:
+                sleep(min(self.tick - (now - sim_time), 0.002))
+                continue
+            ticks = 0
+            while now - sim_time >= self.tick and ticks < self.max_ticks:
+                with self.lock:
+                    calls, self.calls = self.calls, []
+                    inputs, self.inputs = self.inputs, self.inputs.held()
+                for function in calls:
+                    function(game)
+                if self.on_tick:
+                    self.on_tick(inputs)
+                game.step(inputs, self.tick)
+                sim_time += self.tick
+                ticks += 1
+                with self.lock:
+                    self.events.extend(game.events)
+            if ticks == self.max_ticks:
+                #out of ticks for this pass, the clock drops the rest of the backlog the
+                #same way Main.run() empties its accumulator
+                sim_time = max(sim_time, now - self.tick)
+            self.state = RenderState(game, sim_time)
@@ -0,0 +1,196 @@
+import numpy as np
+
+#cell x times this plus cell y, one int64 key per grid cell
+KEY_SPAN = 1 << 32
+
+
+def expand_runs(queries, starts, counts):
+    #every position inside each (start, count) run, paired with the query that found it
+    total = int(counts.sum())
+    run_offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    positions = np.repeat(starts, counts) + np.arange(total) - run_offsets
+    return np.repeat(queries, counts), positions
+
+
+#uniform grid over the static obstacles so collision checks only look at nearby rects
+class SpatialGrid:
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = []
+        self.arrays = None
+        self.keys = None
+        self.owners = None
+
+    def add(self, rect):
+        index = len(self.rects)
+        self.rects.append(rect)
+        self.arrays = None
+        self.keys = None
+        for cell in self.cells_for(rect):
+            self.cells.setdefault(cell, []).append(index)
+
+    def cells_for(self, rect):
+        size = self.cell_size
+        x0, y0 = rect.left // size, rect.top // size
+        x1, y1 = (rect.right - 1) // size, (rect.bottom - 1) // size
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield cx, cy
+
+    def nearby(self, rect):
+        #indices can repeat when an obstacle spans several cells, so keep them unique
+        found = set()
+        for cell in self.cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return [self.rects[i] for i in found]
+
+    def collides(self, rect):
+        for cell in self.cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                for i in bucket:
+                    if rect.colliderect(self.rects[i]):
+                        return True
+        return False
+
+    def rect_arrays(self):
+        #left, top, right, bottom of every obstacle as columns for batched tests
+        if self.arrays is None:
+            edges = np.array([(r.left, r.top, r.right, r.bottom) for r in self.rects], dtype=np.int64)
+            self.arrays = edges.reshape(-1, 4).T
+        return self.arrays
+
+    def cell_arrays(self):
+        #the cells as one key per (cell, obstacle) entry sorted by key, so a batch of
+        #cells can be looked up with searchsorted
+        if self.keys is None:
+            keys = [cx * KEY_SPAN + cy for (cx, cy), bucket in self.cells.items() for _ in bucket]
+            owners = [i for bucket in self.cells.values() for i in bucket]
+            order = np.argsort(np.array(keys, dtype=np.int64), kind="stable")
+            self.keys = np.array(keys, dtype=np.int64)[order]
+            self.owners = np.array(owners, dtype=np.int64)[order]
+        return self.keys, self.owners
+
+    def hits_many(self, left, top, width, height):
+        #(rect index, obstacle index) for every overlapping pair, only testing the obstacles
+        #in the cells each rect covers like collides() does. a pair repeats when both share
+        #more than one cell. rects are truncated to ints like pygame.Rect does
+        left = np.trunc(left).astype(np.int64)
+        top = np.trunc(top).astype(np.int64)
+        right = left + np.asarray(width, dtype=np.int64)
+        bottom = top + np.asarray(height, dtype=np.int64)
+        empty = np.zeros(0, dtype=np.int64)
+        if not self.rects or not len(left):
+            return empty, empty
+        right = np.broadcast_to(right, left.shape)
+        bottom = np.broadcast_to(bottom, left.shape)
+        keys, owners = self.cell_arrays()
+        size = self.cell_size
+        x0, y0 = left // size, top // size
+        x1, y1 = (right - 1) // size, (bottom - 1) // size
+        queries, starts, counts = [], [], []
+        for dx in range(int((x1 - x0).max()) + 1):
+            for dy in range(int((y1 - y0).max()) + 1):
+                box = np.flatnonzero((x0 + dx <= x1) & (y0 + dy <= y1))
+                cell = (x0[box] + dx) * KEY_SPAN + (y0[box] + dy)
+                lo = np.searchsorted(keys, cell, side="left")
+                hi = np.searchsorted(keys, cell, side="right")
+                found = hi > lo
+                queries.append(box[found])
+                starts.append(lo[found])
+                counts.append(hi[found] - lo[found])
+        query, candidate = expand_runs(np.concatenate(queries), np.concatenate(starts), np.concatenate(counts))
+        obstacle = owners[candidate]
+        o_left, o_top, o_right, o_bottom = self.rect_arrays()
+        hit = ((left[query] < o_right[obstacle]) & (o_left[obstacle] < right[query]) &
+               (top[query] < o_bottom[obstacle]) & (o_top[obstacle] < bottom[query]))
+        return query[hit], obstacle[hit]
+
+    def collides_many(self, left, top, width, height):
+        #same answer as collides() for each rect
+        result = np.zeros(len(left), dtype=bool)
+        result[self.hits_many(left, top, width, height)[0]] = True
+        return result
+
+    def way_out_many(self, left, top, width, height):
+        #for rects already overlapping an obstacle: their indices and the unit step along the
+        #shortest way out of it, so something stuck inside a hitbox leaves by its nearest edge
+        query, obstacle = self.hits_many(left, top, width, height)
+        width = np.broadcast_to(width, np.shape(left))
+        height = np.broadcast_to(height, np.shape(left))
+        query, first = np.unique(query, return_index=True)
+        obstacle = obstacle[first]
+        left = np.trunc(left[query])
+        top = np.trunc(top[query])
+        o_left, o_top, o_right, o_bottom = self.rect_arrays()
+        #how far it would have to go left, right, up or down to be clear
+        push = np.stack((left + width[query] - o_left[obstacle], o_right[obstacle] - left,
+                         top + height[query] - o_top[obstacle], o_bottom[obstacle] - top))
+        way = np.argmin(push, axis=0)
+        return query, np.array([-1.0, 1.0, 0.0, 0.0])[way], np.array([0.0, 0.0, -1.0, 1.0])[way]
+
+
+#builds the grid once from environment objects, using their world space hitboxes
+def build_obstacle_grid(environment_objects, cell_size=128):
+    grid = SpatialGrid(cell_size)
+    for obj in environment_objects:
+        if obj.world_collision_rect:
+            grid.add(obj.world_collision_rect)
+    return grid
+
+
+#dynamic grid rebuilt every frame from entity centres, used as the broad phase
+#for bullet hits. entries are sorted by cell key so building it is a few numpy calls
+class BucketGrid:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.reach = 0
+
+    def build(self, ids, xs, ys, reach):
+        #reach is the largest distance from an entity centre to the edge of its rect
+        self.reach = reach
+        if not len(ids):
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.keys = np.zeros(0, dtype=np.int64)
+            return
+        cx = np.floor_divide(xs, self.cell_size).astype(np.int64)
+        cy = np.floor_divide(ys, self.cell_size).astype(np.int64)
+        keys = cx * KEY_SPAN + cy
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.keys = keys
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+
+    def query_many(self, left, top, right, bottom):
+        #batched query for many boxes at once, returns (box index, id) candidate pairs
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(self.keys) or not len(left):
+            return empty, empty
+        size = self.cell_size
+        x0 = np.floor_divide(np.asarray(left) - self.reach, size).astype(np.int64)
+        x1 = np.floor_divide(np.asarray(right) + self.reach, size).astype(np.int64)
+        y0 = np.floor_divide(np.asarray(top) - self.reach, size).astype(np.int64)
+        y1 = np.floor_divide(np.asarray(bottom) + self.reach, size).astype(np.int64)
+        queries, starts, counts = [], [], []
+        #walk the cell offsets rather than the boxes so the python loop stays tiny
+        for dx in range(int((x1 - x0).max()) + 1):
+            for dy in range(int((y1 - y0).max()) + 1):
+                box = np.flatnonzero((x0 + dx <= x1) & (y0 + dy <= y1))
+                if not box.size:
+                    continue
+                keys = (x0[box] + dx) * KEY_SPAN + (y0[box] + dy)
+                lo = np.searchsorted(self.keys, keys, side="left")
+                hi = np.searchsorted(self.keys, keys, side="right")
+                found = hi > lo
+                queries.append(box[found])
+                starts.append(lo[found])
+                counts.append(hi[found] - lo[found])
+        if not queries:
+            return empty, empty
+        queries, positions = expand_runs(np.concatenate(queries), np.concatenate(starts), np.concatenate(counts))
+        return queries, self.ids[positions]
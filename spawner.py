@@ -0,0 +1,67 @@
+import numpy as np
+
+
+#pool of spawn points worked out whenever the loaded area changes, all clear of obstacles.
+#at spawn time the ones on screen, too close to the player or inside the boss's area
+#are filtered out with numpy and a random survivor is handed back.
+#waves are queued and drip fed a few zombies per tick so a big wave never lands in one frame
+class Spawner:
+    def __init__(self, rng, size=30, points=400, min_distance=500, boss_clearance=150, budget=10):
+        self.rng = rng
+        self.size = size
+        self.points = points
+        self.min_distance = min_distance
+        self.boss_clearance = boss_clearance
+        self.budget = budget
+        self.pending = 0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+
+    def build(self, obstacles, area, margin=100):
+        #candidates in batches until enough land clear of every hitbox
+        rng, points = self.rng, self.points
+        xs, ys = [], []
+        clear_size = self.size + 10
+        while len(xs) < points:
+            cx = np.array([rng.uniform(area.left + margin, area.right - margin) for _ in range(points)])
+            cy = np.array([rng.uniform(area.top + margin, area.bottom - margin) for _ in range(points)])
+            blocked = obstacles.collides_many(cx - clear_size / 2, cy - clear_size / 2,
+                                              np.full(points, clear_size), np.full(points, clear_size))
+            xs.extend(cx[~blocked].tolist())
+            ys.extend(cy[~blocked].tolist())
+        self.x = np.array(xs[:points])
+        self.y = np.array(ys[:points])
+
+    def queue(self, count):
+        self.pending += count
+
+    def reset(self):
+        self.pending = 0
+
+    def valid(self, view_rects, players_x, players_y, boss=None):
+        #indices of the points that are off every screen, far enough from every player
+        #and clear of the boss
+        x, y = self.x, self.y
+        ok = np.ones(x.size, dtype=bool)
+        for view_rect, player_x, player_y in zip(view_rects, players_x, players_y):
+            ok &= ((x < view_rect.left) | (x >= view_rect.right) |
+                   (y < view_rect.top) | (y >= view_rect.bottom))
+            ok &= np.hypot(x - player_x, y - player_y) >= self.min_distance
+        if boss is not None:
+            reach = boss.size / 2 + self.boss_clearance
+            ok &= (np.abs(x - boss.world_x) > reach) | (np.abs(y - boss.world_y) > reach)
+        return np.flatnonzero(ok)
+
+    def take(self, count, view_rects, players_x, players_y, boss=None):
+        #count spawn points, falling back to the whole pool if nothing passes the filter
+        choices = self.valid(view_rects, players_x, players_y, boss)
+        if not choices.size:
+            choices = np.arange(self.x.size)
+        picks = [choices[self.rng.randrange(choices.size)] for _ in range(count)]
+        return [(float(self.x[i]), float(self.y[i])) for i in picks]
+
+    def due(self):
+        #how many queued zombies should come in this tick
+        count = min(self.pending, self.budget)
+        self.pending -= count
+        return count
@@ -0,0 +1,50 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+
+#shares pre-rotated frames between every entity using the same image
+#angles are snapped to buckets so a whole horde only needs a handful of rotations
+class RotationCache:
+    def __init__(self, step_degrees=2, max_size=1024):
+        self.step = step_degrees
+        self.max_size = max_size
+        self.frames = OrderedDict()
+
+    def bucket(self, angle):
+        #angle comes in as radians the same way entities store it
+        degrees = -math.degrees(angle)
+        return int(round(degrees / self.step)) % int(360 / self.step)
+
+    def get(self, image, angle):
+        return self.frame(image, self.bucket(angle))
+
+    def frame(self, image, bucket):
+        key = (image, bucket)
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            return frame
+        frame = pygame.transform.rotate(image, key[1] * self.step)
+        self.frames[key] = frame
+        if len(self.frames) > self.max_size:
+            self.frames.popitem(last=False)
+        return frame
+
+    def get_many(self, image, angles):
+        #frames for a whole array of angles, each bucket is only looked up once
+        steps = int(360 / self.step)
+        buckets = np.rint(-np.degrees(angles) / self.step).astype(int) % steps
+        frames = {bucket: self.frame(image, bucket) for bucket in np.unique(buckets).tolist()}
+        return [frames[bucket] for bucket in buckets.tolist()]
+
+    def warm(self, image):
+        #fills every bucket for an image up front so nothing rotates mid game
+        for i in range(int(360 / self.step)):
+            key = (image, i)
+            if key not in self.frames:
+                self.frames[key] = pygame.transform.rotate(image, i * self.step)
+        while len(self.frames) > self.max_size:
+            self.frames.popitem(last=False)
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+import pygame
+
+
+#the grass, rocks and world border never change, so they are baked into big
+#world space chunks once and each frame only blits the few chunks the camera sees.
+#trees aren't baked in because they have to sort against the player
+class StaticLayer:
+    def __init__(self, ground_image, images, world_width, world_height,
+                 chunk_size=512, max_chunks=32):
+        self.ground_image = ground_image
+        self.images = images
+        self.world_width = world_width
+        self.world_height = world_height
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.objects = []
+
+    def set_objects(self, objects):
+        #world space rect of every baked object's image. the loaded world chunks move with
+        #the players, so rocks come and go inside chunks that were baked earlier. any baked
+        #chunk touching a rock that appeared or disappeared is dropped and baked again when seen
+        old = {(rect.center, image) for image, rect in self.objects}
+        self.objects = []
+        for obj in objects:
+            image = self.images[obj.kind]
+            rect = image.get_rect(center=(obj.world_x, obj.world_y))
+            self.objects.append((image, rect))
+        new = {(rect.center, image) for image, rect in self.objects}
+        changed = [image.get_rect(center=center) for center, image in old ^ new]
+        if changed:
+            size = self.chunk_size
+            for key in [key for key in self.chunks
+                        if pygame.Rect(key[0] * size, key[1] * size, size, size).collidelist(changed) != -1]:
+                del self.chunks[key]
+
+    def bake(self, cx, cy):
+        size = self.chunk_size
+        left, top = cx * size, cy * size
+        chunk = pygame.Surface((size, size)).convert()
+
+        # ground, tiled from the world origin so it lines up across chunks
+        ground = self.ground_image
+        tile_w, tile_h = ground.get_width(), ground.get_height()
+        start_x = left // tile_w * tile_w
+        start_y = top // tile_h * tile_h
+        tiles = [(ground, (x - left, y - top))
+                 for x in range(start_x, left + size, tile_w)
+                 for y in range(start_y, top + size, tile_h)]
+        chunk.blits(tiles, doreturn=False)
+
+        # rocks, including ones that hang over from a neighbouring chunk
+        area = pygame.Rect(left, top, size, size)
+        chunk.blits([(image, (rect.x - left, rect.y - top))
+                     for image, rect in self.objects if rect.colliderect(area)], doreturn=False)
+
+        # World boundary
+        pygame.draw.rect(chunk, (0, 0, 0), pygame.Rect(-left, -top, self.world_width, self.world_height), 5)
+        return chunk
+
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.bake(cx, cy)
+            self.chunks[key] = chunk
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def draw(self, screen, camera_x, camera_y):
+        size = self.chunk_size
+        width, height = screen.get_size()
+        x0, y0 = camera_x // size, camera_y // size
+        x1, y1 = (camera_x + width - 1) // size, (camera_y + height - 1) // size
+        screen.blits([(self.chunk(cx, cy), (cx * size - camera_x, cy * size - camera_y))
+                      for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)], doreturn=False)
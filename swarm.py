@@ -0,0 +1,210 @@
+import math
+
+import numpy as np
+
+#directions a blocked zombie tries, in order, before giving up for the frame
+AVOID_OFFSETS = (math.pi / 6, -math.pi / 6, math.pi / 3, -math.pi / 3)
+
+#simulation detail by distance from the target: (up to distance, ticks between updates,
+#most zombies updated per tick or None for no limit). the first band covers the screen
+#and hearing range and gets the full treatment, the rest move in bigger, coarser steps
+LOD_BANDS = ((800, 1, None), (1600, 4, 500), (math.inf, 12, 250))
+
+
+#struct of arrays store for every zombie so movement runs as a few numpy ops
+#slots never move while alive, so Enemy objects can keep their index
+class EnemySwarm:
+    def __init__(self, capacity=256, bands=LOD_BANDS):
+        self.bands = bands
+        self.band_edges = np.array([band[0] for band in bands[:-1]], dtype=float)
+        self.band_intervals = np.array([band[1] for band in bands], dtype=float)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        #positions at the start of the tick, for drawing in between ticks
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.size = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.tier = np.zeros(capacity, dtype=np.int64)
+        self.pending = np.zeros(capacity) #ticks of movement owed since the last update
+        self.owners = [None] * capacity #whatever object is using each slot
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def capacity(self):
+        return len(self.alive)
+
+    def grow(self):
+        old = self.capacity()
+        new = old * 2
+        for name in ("x", "y", "prev_x", "prev_y", "angle", "speed", "size", "alive", "tier", "pending"):
+            array = getattr(self, name)
+            grown = np.zeros(new, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        self.owners.extend([None] * (new - old))
+        self.free.extend(range(new - 1, old - 1, -1))
+
+    def spawn(self, x, y, speed, size, owner=None):
+        if not self.free:
+            self.grow()
+        index = self.free.pop()
+        self.x[index] = self.prev_x[index] = x
+        self.y[index] = self.prev_y[index] = y
+        self.angle[index] = 0
+        self.speed[index] = speed
+        self.size[index] = size
+        self.alive[index] = True
+        self.tier[index] = 0
+        self.pending[index] = 0
+        self.owners[index] = owner
+        return index
+
+    def kill(self, index):
+        if self.alive[index]:
+            self.alive[index] = False
+            self.owners[index] = None
+            self.free.append(index)
+
+    def clear(self):
+        self.alive[:] = False
+        self.owners = [None] * self.capacity()
+        self.free = list(range(self.capacity() - 1, -1, -1))
+
+    def count(self):
+        return int(np.count_nonzero(self.alive))
+
+    def alive_slots(self):
+        return np.flatnonzero(self.alive)
+
+    def save_previous(self):
+        np.copyto(self.prev_x, self.x)
+        np.copyto(self.prev_y, self.y)
+
+    def positions(self, slots, alpha=1.0):
+        #where the given slots are alpha of the way through the current tick
+        prev_x, prev_y = self.prev_x[slots], self.prev_y[slots]
+        return (prev_x + (self.x[slots] - prev_x) * alpha,
+                prev_y + (self.y[slots] - prev_y) * alpha)
+
+    def view(self):
+        #the zombie arrays the renderer and minimap look at, copied so a published
+        #RenderState keeps its frame while the simulation thread moves the horde on
+        view = EnemySwarm(0, self.bands)
+        for name in ("x", "y", "prev_x", "prev_y", "angle", "alive", "tier"):
+            setattr(view, name, getattr(self, name).copy())
+        return view
+
+    def near_slots(self):
+        #live zombies in the full detail band, the only ones worth drawing or hearing
+        return np.flatnonzero(self.alive & (self.tier == 0))
+
+    def rect_edges(self, slots):
+        #left, top, right, bottom of each slot's rect, truncated like pygame.Rect
+        half = self.size[slots] // 2
+        left = np.trunc(self.x[slots] - half).astype(np.int64)
+        top = np.trunc(self.y[slots] - half).astype(np.int64)
+        return left, top, left + self.size[slots], top + self.size[slots]
+
+    def overlapping(self, slots, rect):
+        #which of the given slots have a rect touching rect, matching pygame's colliderect
+        left, top, right, bottom = self.rect_edges(slots)
+        hit = ((left < rect.right) & (rect.left < right) &
+               (top < rect.bottom) & (rect.top < bottom))
+        return slots[hit]
+
+    def build_grid(self, grid):
+        slots = self.alive_slots()
+        reach = int(self.size[slots].max()) if slots.size else 0
+        grid.build(slots, self.x[slots], self.y[slots], reach)
+
+    def nearest(self, x, y, targets_x, targets_y):
+        #the closest target to each position. one target, the usual case, comes back as is
+        targets_x = np.atleast_1d(np.asarray(targets_x, dtype=float))
+        targets_y = np.atleast_1d(np.asarray(targets_y, dtype=float))
+        if targets_x.size == 1:
+            return targets_x[0], targets_y[0]
+        dist = np.hypot(x[:, None] - targets_x, y[:, None] - targets_y)
+        best = np.argmin(dist, axis=1)
+        return targets_x[best], targets_y[best]
+
+    def schedule(self, idx, target_x, target_y, scale):
+        #picks which zombies move this tick and how far, far bands are only due every few
+        #ticks and then move all the time they are owed in one go. when a band has more
+        #due than its budget the ones waiting longest go first and the rest catch up later
+        dist = np.hypot(self.x[idx] - target_x, self.y[idx] - target_y)
+        tier = np.searchsorted(self.band_edges, dist)
+        self.tier[idx] = tier
+        pending = self.pending[idx] + scale
+        due = np.zeros(idx.size, dtype=bool)
+        for level, (_, interval, budget) in enumerate(self.bands):
+            ready = np.flatnonzero((tier == level) & (pending + 1e-6 >= interval))
+            if budget is not None and ready.size > budget:
+                ready = ready[np.argpartition(-pending[ready], budget)[:budget]]
+            due[ready] = True
+        #a zombie left waiting too long only gets two intervals of movement back
+        limit = self.band_intervals[tier] * 2
+        step = np.minimum(pending, np.maximum(limit, scale))
+        self.pending[idx] = np.where(due, 0, pending)
+        return due, step, tier
+
+    def update(self, target_x, target_y, obstacles, scale=1.0, flow=None):
+        #steers every due zombie at the target, trying the avoid angles when blocked.
+        #the target can also be a list of positions, each zombie then takes the closest.
+        #with a flow field they follow its directions around obstacles instead of
+        #walking straight into them. far zombies skip the avoid angles, coarse is fine
+        #where nobody can see them
+        idx = np.flatnonzero(self.alive)
+        if not idx.size:
+            return
+        target_x, target_y = self.nearest(self.x[idx], self.y[idx], target_x, target_y)
+        due, step, tier = self.schedule(idx, target_x, target_y, scale)
+        detailed = tier[due] == 0
+        step = step[due]
+        idx = idx[due]
+        if not idx.size:
+            return
+        if np.ndim(target_x):
+            target_x, target_y = target_x[due], target_y[due]
+        x, y = self.x[idx], self.y[idx]
+        angle = np.arctan2(target_y - y, target_x - x)
+        if flow is not None:
+            dir_x, dir_y, valid = flow.directions(x, y)
+            angle = np.where(valid, np.arctan2(dir_y, dir_x), angle)
+        self.angle[idx] = angle
+
+        speed = self.speed[idx] * step
+        size = self.size[idx]
+        half = size // 2
+        move_x = speed * np.cos(angle)
+        move_y = speed * np.sin(angle)
+        blocked = obstacles.collides_many(x + move_x - half, y + move_y - half, size, size)
+        #a zombie already inside a hitbox, say one that walked through an unloaded chunk,
+        #walks out by the nearest edge instead of wherever it was heading
+        stuck = np.flatnonzero(blocked)
+        if stuck.size:
+            inside, out_x, out_y = obstacles.way_out_many(x[stuck] - half[stuck], y[stuck] - half[stuck],
+                                                          size[stuck], size[stuck])
+            inside = stuck[inside]
+            move_x[inside] = speed[inside] * out_x
+            move_y[inside] = speed[inside] * out_y
+            blocked[inside] = False
+        free = ~blocked
+        self.x[idx[free]] += move_x[free]
+        self.y[idx[free]] += move_y[free]
+
+        pending = np.flatnonzero(blocked & detailed)
+        for offset in AVOID_OFFSETS:
+            if not pending.size:
+                break
+            alt = angle[pending] + offset
+            alt_x = speed[pending] * np.cos(alt)
+            alt_y = speed[pending] * np.sin(alt)
+            hit = obstacles.collides_many(x[pending] + alt_x - half[pending],
+                                          y[pending] + alt_y - half[pending],
+                                          size[pending], size[pending])
+            ok = ~hit
+            self.x[idx[pending[ok]]] += alt_x[ok]
+            self.y[idx[pending[ok]]] += alt_y[ok]
+            pending = pending[hit]
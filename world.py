@@ -0,0 +1,101 @@
+import random
+
+import pygame
+
+#side of one world chunk, everything within a chunk of the player's is kept loaded
+CHUNK_SIZE = 1000
+
+
+class EnvironmentObject:
+    def __init__(self, kind, x, y, collision_rect=None):
+        self.kind = kind
+        self.world_x = x
+        self.world_y = y
+        self.collision_rect = collision_rect
+        self.is_tree = kind == "tree"
+        #hitbox in world space, worked out once since obstacles never move
+        self.world_collision_rect = None
+        if collision_rect:
+            self.world_collision_rect = pygame.Rect(
+                x + collision_rect.x,
+                y + collision_rect.y,
+                collision_rect.width,
+                collision_rect.height
+            )
+
+
+#the map split into chunks whose trees and rocks are generated on demand from the
+#world seed and the chunk's position, so a chunk always comes back the same.
+#only the chunks around the player are kept, so the cost of everything that walks
+#the obstacles depends on that area and not on how big the world is
+class World:
+    def __init__(self, seed, width, height, chunk_size=CHUNK_SIZE, trees=5, rocks=3, radius=1, slack=200):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.trees = trees
+        self.rocks = rocks
+        self.radius = radius
+        #how far the player can stray past the centre chunk before the area moves,
+        #so walking along a chunk edge doesn't keep reloading
+        self.slack = slack
+        self.cols = -(-width // chunk_size)
+        self.rows = -(-height // chunk_size)
+        self.chunks = {}
+        self.objects = []
+        self.centre = None
+
+    def chunk_of(self, x, y):
+        size = self.chunk_size
+        return (min(max(int(x // size), 0), self.cols - 1),
+                min(max(int(y // size), 0), self.rows - 1))
+
+    def generate(self, cx, cy):
+        rng = random.Random(f"{self.seed}:{cx}:{cy}")
+        size = self.chunk_size
+        margin = 100
+        x0, x1 = max(cx * size, margin), min((cx + 1) * size, self.width - margin)
+        y0, y1 = max(cy * size, margin), min((cy + 1) * size, self.height - margin)
+        objects = []
+        for _ in range(self.trees):
+            x, y = rng.randint(x0, x1), rng.randint(y0, y1)
+            trunk_rect = pygame.Rect(-10, 30, 20, 40)
+            objects.append(EnvironmentObject("tree", x, y, trunk_rect))
+        for _ in range(self.rocks):
+            x, y = rng.randint(x0, x1), rng.randint(y0, y1)
+            rock_rect = pygame.Rect(-50, -30, 100, 70)
+            objects.append(EnvironmentObject("rock", x, y, rock_rect))
+        return objects
+
+    def bounds(self):
+        #world space rect covering every loaded chunk
+        size = self.chunk_size
+        cx, cy = self.centre
+        left = max(cx - self.radius, 0) * size
+        top = max(cy - self.radius, 0) * size
+        right = min((cx + self.radius + 1) * size, self.width)
+        bottom = min((cy + self.radius + 1) * size, self.height)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def update(self, x, y):
+        #loads and drops chunks around x, y, returns True when the loaded set changed
+        if self.centre is not None:
+            size, slack = self.chunk_size, self.slack
+            cx, cy = self.centre
+            if pygame.Rect(cx * size - slack, cy * size - slack, size + 2 * slack, size + 2 * slack).collidepoint(x, y):
+                return False
+        centre = self.chunk_of(x, y)
+        if centre == self.centre:
+            return False
+        self.load(centre)
+        return True
+
+    def load(self, centre):
+        #makes centre the middle chunk, keeping whichever chunks are still in range
+        self.centre = centre
+        wanted = [(cx, cy)
+                  for cx in range(max(centre[0] - self.radius, 0), min(centre[0] + self.radius, self.cols - 1) + 1)
+                  for cy in range(max(centre[1] - self.radius, 0), min(centre[1] + self.radius, self.rows - 1) + 1)]
+        self.chunks = {key: self.chunks[key] if key in self.chunks else self.generate(*key) for key in wanted}
+        self.objects = [obj for key in wanted for obj in self.chunks[key]]